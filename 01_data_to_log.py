@@ -1,14 +1,25 @@
 # 01_data_to_log.py
 
 ### IMPORT ###
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
+from pandas.tseries.api import guess_datetime_format
 import csv
+import argparse
 
 ### LOCAL IMPORT ###
 from config import config_reader
-from utility_manager.utilities import json_to_list_dict, json_to_sorted_dict, check_and_create_directory, list_files_by_type, get_values_from_dict_list, df_read_csv, df_print_details, distinct_values_frequencies, save_stats, script_info
+from utility_manager.utilities import json_to_list_dict, json_to_sorted_dict, check_and_create_directory, list_files_by_type, od_file_source, get_values_from_dict_list, df_print_details, distinct_values_frequencies, save_stats, script_info
+from utility_manager.memory_budget import MEMORY_SHARE_DATA, MEMORY_SHARE_PARTITION, memory_budget_bytes, csv_chunk_rows, case_partition_bounds, df_case_partition
+from utility_manager.bitmap_index import bitmap_index_path, bitmap_index_build, bitmap_index_save
+from utility_manager.duration_stats import thresholds_bounds
+from utility_manager.checkpoint import checkpoint_fingerprint, checkpoint_open, checkpoint_save, checkpoint_load
+from utility_manager.enrichment import LOOKUP_AGG_DEFAULT, enrich_key_columns, lookup_read, enrich_case_table
+from utility_manager.sampling import sample_cases
+from utility_manager.csv_writer import csv_workers_count
+from utility_manager.backends import execution_backend
 
 ### GLOBALS ###
 yaml_config = config_reader.config_read_yaml("config.yml", "config")
@@ -21,11 +32,26 @@ conf_file_cols_type = str(yaml_config["CONF_COLS_TYPE_FILE"])
 conf_file_stats_inc = str(yaml_config["CONF_COLS_STATS_FILE"]) 
 conf_file_filters = str(yaml_config["CONF_COLS_FILTER_FILE"]) 
 conf_file_log = str(yaml_config["CONF_LOG_FILE"])             
+conf_file_enrich = str(yaml_config["CONF_COLS_ENRICH_FILE"])
 
 stats_do = 0 # 0 if stats are not needed, else 1
 
 stats_dir =  str(yaml_config["OD_STATS_DIR"])
 log_dir =  str(yaml_config["EVENT_LOG_DIR"])
+checkpoint_dir = str(yaml_config["CHECKPOINT_DIR"])
+memory_budget = memory_budget_bytes(yaml_config["MEMORY_BUDGET_MB"]) # None if there is no budget
+memory_sample_rows = int(yaml_config["MEMORY_SAMPLE_ROWS"])
+csv_write_workers = csv_workers_count(yaml_config["CSV_WRITE_WORKERS"]) # processes formatting the event logs
+csv_write_chunk_rows = int(yaml_config["CSV_WRITE_CHUNK_ROWS"])
+csv_write_compression = str(yaml_config["CSV_WRITE_COMPRESSION"])
+backend = execution_backend(str(yaml_config["EXECUTION_BACKEND"])) # core operations (read, semi-join, concat, sort, group, write)
+list_index_cols = list(yaml_config["INDEX_COLS"])
+index_amount_col = str(yaml_config["INDEX_AMOUNT_COL"])
+list_index_amount_bounds = thresholds_bounds(dict(yaml_config["THRESHOLDS"])) # bounds of the amount buckets
+sample_fraction = float(yaml_config["SAMPLE_FRACTION"] or 0) # 0 if the cases are not sampled
+list_sample_strata = list(yaml_config["SAMPLE_STRATA"])
+sample_seed = str(yaml_config["SAMPLE_SEED"])
+list_checkpoint_keys = ["OD_ANAC_DIR", "OD_FILE_TYPE", "CSV_FILE_SEP", "TENDER_MAIN_FILE", "CONF_COLS_TYPE_FILE", "CONF_COLS_STATS_FILE", "CONF_COLS_FILTER_FILE", "CONF_LOG_FILE", "CONF_COLS_ENRICH_FILE", "SAMPLE_FRACTION", "SAMPLE_STRATA", "SAMPLE_SEED"] # settings of config.yml read by the stages (in the fingerprint of the checkpoints)
 
 file_log_out = "anac_log_2016_2022.csv" # OUTPUT
 file_log_caseids_out = "anac_log_2016_2022_caseids.csv" # OUTPUT: all the case-ids (CIG)
@@ -161,17 +187,445 @@ def fill_group_values(df, columns):
         df.loc[:, column] = df.groupby('case_id')[column].transform(lambda x: x.ffill().bfill())
     return df
 
-### MAIN ###
+def tender_clean(df_od: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans the main tender file (or a chunk of its rows, every step works row by row).
+        Adds the column "cpv_division" that takes the first two characters of "cod_cpv" if it's not null.
+        Adds the column "accordo_quadro" (1 or 0).
+        From the columns "settore" and "sezione_regionale" removes the redundant strings, codes "oggetto_principale_contratto".
 
-def main():
-    print()
-    print(f"*** PROGRAM START ({script_name}) ***")
-    print()
+    Parameters:
+        df_od (pd.DataFrame): the main tender file.
 
-    start_time = datetime.now().replace(microsecond=0)
-    print("Start process: " + str(start_time))
+    Returns:
+        pd.DataFrame: the cleaned main tender file.
+    """
+    df_od['cpv_division'] = df_od['cod_cpv'].apply(lambda x: x[:2] if pd.notnull(x) else None)
+    df_od['accordo_quadro'] = df_od['cig_accordo_quadro'].apply(lambda x: "1" if pd.notna(x) else "0")
+    df_od['accordo_quadro'] = df_od['accordo_quadro'].astype('object')
+    df_od['settore'] = df_od['settore'].str.replace('SETTORI ', '')
+    df_od['sezione_regionale'] = df_od['sezione_regionale'].str.replace('SEZIONE REGIONALE  ', '')
+    df_od['sezione_regionale'] = df_od['sezione_regionale'].str.replace('SEZIONE REGIONALE ', '')
+    df_od['sezione_regionale'] = df_od['sezione_regionale'].str.replace('PROVINCIA AUTONOMA DI', 'PA')
+    df_od['oggetto_principale_contratto'] = df_od['oggetto_principale_contratto'].str.replace('FORNITURE', 'U') # sUpplies
+    df_od['oggetto_principale_contratto'] = df_od['oggetto_principale_contratto'].str.replace('SERVIZI', 'S') # Services
+    df_od['oggetto_principale_contratto'] = df_od['oggetto_principale_contratto'].str.replace('LAVORI', 'W') # Work
+    return df_od
+
+def tender_sample(df_od: pd.DataFrame) -> list:
+    """
+    Selects the sample of the cases from the cleaned main tender file (see sample_cases).
+
+    Parameters:
+        df_od (pd.DataFrame): the cleaned main tender file (at least the CIG and the strata columns).
+
+    Returns:
+        list: the IDs (CIG) of the tenders in the sample.
+    """
+    print(f"> Sampling cases (fraction {sample_fraction}, strata {list_sample_strata}, seed '{sample_seed}')")
+    list_cig_sample = sample_cases(df_od, sample_fraction, list_sample_strata, sample_seed)
+    print(f"Cases in the sample: {len(list_cig_sample)} of {df_od['cig'].nunique()}")
+    return list_cig_sample
+
+def tender_filter(df_od: pd.DataFrame, list_col_filters: list) -> pd.DataFrame:
+    """
+    Keeps the rows of the main tender file with the values of the filters.
+
+    Parameters:
+        df_od (pd.DataFrame): the main tender file (or a chunk of its rows).
+        list_col_filters (list): the filters (column and values to be kept).
+
+    Returns:
+        pd.DataFrame: the filtered rows.
+    """
+    for filter_dict in list_col_filters:
+        for key, value in filter_dict.items():
+            # print("Distinct values before filtering:", list(df_od[key].unique())) # debug
+            # print("Filter key:", key, "filter value:", value) # debug
+            df_od = df_od[df_od[key].isin(value)]
+            # print("DF size after filter:", df_od.shape) # debug
+    return df_od
+
+def od_file_to_log(file_od: str, list_col_type_dic: dict, list_col_stats_dic: list, list_col_filters_dic: list, list_col_log_dic: list, list_col_enrich_dic: list = [], list_cig_keep: list = None) -> tuple:
+    """
+    Reads a file (dataset) of the Open Data catalogue, creates its stats (if needed), applies the filters and extracts its events.
+
+    Parameters:
+        file_od (str): the file name (is also the event name, without extension).
+        list_col_type_dic (dict): columns type.
+        list_col_stats_dic (list): columns to be included in stats for each file.
+        list_col_filters_dic (list): columns to be filtered for each file.
+        list_col_log_dic (list): columns to be used in the event log for each file.
+        list_col_enrich_dic (list): lookup datasets to be attached to the cases (their keys are kept in the case table).
+        list_cig_keep (list): the IDs (CIG) of the tenders kept in the sample, only their rows are read (None to read all the rows).
+
+    Returns:
+        tuple: the event log of the file (None if the file has no events), the event log columns of the file, the list of IDs (CIG) of the tenders to be kept and the case table with the keys of the lookup datasets (both None if the file is not the main file).
+    """
+    list_cig = None # IDs of tenders (only for the main file)
+    df_case_keys = None # case table (only for the main file)
+
+    # File info
+    print("> Reading file")
+    print("File:", file_od)
+    file_path = Path(file_od)
+    file_stem = file_path.stem # get the name without extension (is also the event name)
+
+    # Get the columns to be included in stats by file name
+    list_col_stats_inc = get_values_from_dict_list(list_col_stats_dic, file_od)
+    list_col_stats_inc_len = len(list_col_stats_inc)
+
+    # Get the columns to be filtered by file name
+    list_col_filters = get_values_from_dict_list(list_col_filters_dic, file_od)
+    list_col_filters_len = len(list_col_filters)
+
+    # With a memory budget, the file is read in chunks if it does not fit in the budget (or its size is unknown)
+    chunk_rows = csv_chunk_rows(od_anac_dir, file_od, list_col_type_dic, memory_budget, memory_sample_rows, csv_sep)
+    if chunk_rows is not None and stats_do == 0:
+        # Only the events of the chunks are kept (the stats need the whole file)
+        return od_file_to_log_chunks(file_od, chunk_rows, list_col_type_dic, list_col_filters, list_col_log_dic, list_col_enrich_dic, list_cig_keep)
+
+    # Read the file (dataset)
+    list_col_exc = [] # no columns to exclude
+    df_od = backend.read_csv(od_anac_dir, file_od, list_col_exc, list_col_type_dic, csv_sep, chunk_rows, list_cig_keep)
+    df_print_details(df_od, f"File '{file_od}'")
     print()
 
+    if file_od == tender_main_file:
+        print(f"> Updating main tender file '{file_od}'")
+        df_od = tender_clean(df_od)
+        df_print_details(df_od, f"File '{file_od}' (after cleaning)")
+
+        # Sample of the cases (development runs): a deterministic fraction of the CIG of every stratum
+        if sample_fraction > 0:
+            list_cig_sample = tender_sample(df_od)
+            df_od = df_od[df_od["cig"].isin(set(list_cig_sample))]
+            df_print_details(df_od, f"File '{file_od}' (sample)")
+
+    if stats_do == 1:
+        # Stats 1 - Missing values
+        print(">> Creating stats")
+        print("> Missing values")
+        dic_od = summarize_dataframe_to_dict(df_od, file_od)
+        # print(dic_od) # debug
+        df_stats = summarize_dataframe_to_df(dic_od)
+        # print(df_stats.head()) # debug
+        print("> Saving stats")
+        save_stats(df_stats, file_stem, "_stats_missing", stats_dir)
+        print()
+
+        # Stats 2 - Distinct values
+        print("> Distinct values")
+        print("Colums included for this stat:", list_col_stats_inc_len)
+        print(list_col_stats_inc) # debug
+        if list_col_stats_inc_len > 0:
+            df_stats = distinct_values_frequencies(df_od, list_col_stats_inc)
+            # print(df_stats.head()) # debug
+            print("> Saving stats")
+            save_stats(df_stats, file_stem, "_stats_distinct", stats_dir)
+        print()
+
+    # Filters
+    if file_od == tender_main_file and list_col_filters_len > 0:
+        print(">> Applying filters")
+        print(f"Filters applied ({list_col_filters_len}):", list_col_filters)
+        df_od = tender_filter(df_od, list_col_filters)
+        df_print_details(df_od, f"File '{file_od}' (after filtering)")
+        # Create list of ids (cig) to be kept in event log
+        list_cig = list(df_od["cig"].unique())
+        # list_cig
+        # Create the case table with the keys of the lookup datasets (first row of every CIG)
+        if len(list_col_enrich_dic) > 0:
+            list_col_keys = [col for col in enrich_key_columns(list_col_enrich_dic) if col in df_od.columns]
+            df_case_keys = df_od[["cig"] + list_col_keys].drop_duplicates(subset=["cig"], keep="first").reset_index(drop=True)
+        print()
+
+    # Create the log for this dataframe
+    print("> Extracting event log data")
+    # Get the columns to be filtered by file name
+    list_col_log = get_values_from_dict_list(list_col_log_dic, file_od)
+    list_col_log_len = len(list_col_log)
+    print(f"Features for this dataframe ({list_col_log_len}): {list_col_log}")
+    df_log = None
+    if list_col_log_len > 0:
+        print("Event log for event:", file_stem)
+        dic_log = create_event_log_dict(df_od, list_col_log, file_stem)
+        if "error" not in dic_log:
+            df_log = pd.DataFrame(dic_log)
+            print("Event log shape:", df_log.shape)
+    return df_log, list_col_log, list_cig, df_case_keys
+
+def od_file_to_log_chunks(file_od: str, chunk_rows: int, list_col_type_dic: dict, list_col_filters: list, list_col_log_dic: list, list_col_enrich_dic: list = [], list_cig_keep: list = None) -> tuple:
+    """
+    Extracts the events of a file not fitting in the memory budget as od_file_to_log, chunk by chunk: only the events (and, for the main file, the IDs and keys of the tenders) of the chunks are kept, not the file.
+    With a sample, the main file is read twice: first only the CIG and the strata columns of its rows are kept to select the sample, then only the rows of the sampled tenders are read.
+
+    Parameters:
+        file_od (str): the file name (is also the event name, without extension).
+        chunk_rows (int): the rows of every chunk.
+        list_col_type_dic (dict): columns type.
+        list_col_filters (list): the filters of the file.
+        list_col_log_dic (list): columns to be used in the event log for each file.
+        list_col_enrich_dic (list): lookup datasets to be attached to the cases (their keys are kept in the case table).
+        list_cig_keep (list): the IDs (CIG) of the tenders kept in the sample, only their rows are read (None to read all the rows).
+
+    Returns:
+        tuple: as od_file_to_log.
+    """
+    file_stem = Path(file_od).stem
+    list_col_exc = [] # no columns to exclude
+    is_main = file_od == tender_main_file
+    print(f"Reading and extracting the events in chunks of rows ({chunk_rows})")
+
+    if is_main and sample_fraction > 0:
+        list_df_strata = []
+        for df_od in backend.read_csv_chunks(od_anac_dir, file_od, list_col_exc, list_col_type_dic, csv_sep, chunk_rows):
+            df_od = tender_clean(df_od)
+            list_df_strata.append(df_od[["cig"] + [col for col in list_sample_strata if col in df_od.columns]])
+        list_cig_keep = tender_sample(pd.concat(list_df_strata))
+        del list_df_strata
+
+    list_col_log = get_values_from_dict_list(list_col_log_dic, file_od)
+    list_col_keys = enrich_key_columns(list_col_enrich_dic) if len(list_col_enrich_dic) > 0 else None
+    list_log_chunks = []       # events of every chunk
+    list_cig_chunks = []       # IDs of the tenders of every chunk (main file)
+    list_case_keys_chunks = [] # case table of every chunk (main file)
+    rows_num = 0
+    for df_od in backend.read_csv_chunks(od_anac_dir, file_od, list_col_exc, list_col_type_dic, csv_sep, chunk_rows, list_cig_keep):
+        rows_num += len(df_od)
+        if is_main:
+            df_od = tender_clean(df_od)
+            if len(list_col_filters) > 0:
+                df_od = tender_filter(df_od, list_col_filters)
+                list_cig_chunks.append(df_od["cig"].unique())
+                if list_col_keys is not None:
+                    list_case_keys_chunks.append(df_od[["cig"] + [col for col in list_col_keys if col in df_od.columns]].drop_duplicates(subset=["cig"], keep="first"))
+        if len(list_col_log) > 0:
+            dic_log = create_event_log_dict(df_od, list_col_log, file_stem)
+            if "error" not in dic_log:
+                list_log_chunks.append(pd.DataFrame(dic_log))
+    print("Rows read:", rows_num)
+
+    list_cig = None
+    df_case_keys = None
+    if len(list_cig_chunks) > 0:
+        list_cig = list(pd.unique(np.concatenate(list_cig_chunks)))
+        print("Tenders kept:", len(list_cig))
+    if len(list_case_keys_chunks) > 0:
+        df_case_keys = pd.concat(list_case_keys_chunks).drop_duplicates(subset=["cig"], keep="first").reset_index(drop=True)
+    df_log = None
+    if len(list_log_chunks) > 0:
+        df_log = pd.concat(list_log_chunks, ignore_index=True)
+        print("Event log shape:", df_log.shape)
+    return df_log, list_col_log, list_cig, df_case_keys
+
+def enrich_cases(df_case_keys: pd.DataFrame, list_col_enrich_dic: list, list_od_files: list, list_col_type_dic: dict) -> pd.DataFrame:
+    """
+    Attaches the attributes of the lookup datasets (e.g., contracting authorities, economic operators) to the cases.
+    Every lookup dataset is read once with only its key and the needed columns, and joined to the case table through a hash index on its key: the attributes are attached to the events only when the event log is finalised.
+
+    Parameters:
+        df_case_keys (pd.DataFrame): the case table with the keys of the lookup datasets (see od_file_to_log).
+        list_col_enrich_dic (list): lookup datasets with their keys, columns, prefix, row filters and aggregation (see conf_cols_enrich.json).
+        list_od_files (list): the files of the Open Data catalogue.
+        list_col_type_dic (dict): columns type (for the memory estimate).
+
+    Returns:
+        pd.DataFrame: the case attributes indexed by case ID (None if no attributes were attached).
+    """
+    list_col_attr = []
+    for enrich_dic in list_col_enrich_dic:
+        for file_lookup, conf_enrich in enrich_dic.items():
+            col_tender, col_lookup = conf_enrich["key"]
+            list_features = conf_enrich["features"]
+            prefix = conf_enrich.get("prefix", "")
+            dic_where = conf_enrich.get("where", {})
+            agg = conf_enrich.get("agg", LOOKUP_AGG_DEFAULT)
+            print("> Enriching from file")
+            print("File:", file_lookup)
+            print("Rows kept:", dic_where if len(dic_where) > 0 else "all")
+            print("Aggregation:", agg)
+            if file_lookup not in list_od_files:
+                print(f"Warning: the file '{file_lookup}' is not in the catalogue, skipped")
+                continue
+            if col_tender not in df_case_keys.columns:
+                print(f"Warning: the key '{col_tender}' is not in the main tender file, skipped")
+                continue
+            chunk_rows = csv_chunk_rows(od_anac_dir, file_lookup, list_col_type_dic, memory_budget, memory_sample_rows, csv_sep)
+            df_lookup = lookup_read(od_anac_dir, file_lookup, col_lookup, list_features, df_case_keys[col_tender].dropna().unique(), chunk_rows, csv_sep, dic_where, agg)
+            print(f"Lookup keys ({col_lookup}) found: {len(df_lookup)}")
+            df_case_keys = enrich_case_table(df_case_keys, df_lookup, col_tender, list_features, prefix)
+            list_col_attr.extend(f"{prefix}{col}" for col in list_features)
+            print(f"Case attributes added ({len(list_features)}):", [f"{prefix}{col}" for col in list_features])
+            print()
+    if len(list_col_attr) == 0:
+        return None
+    return df_case_keys.set_index("cig")[list_col_attr]
+
+def merge_event_log(list_log_df: list, list_cig: list, date_format: str = None) -> pd.DataFrame:
+    """
+    Merges the event logs of the files, keeping only the events of the tenders to be kept, orders the events by case and timestamp and keeps only the cases starting with the TENDER_NOTICE event.
+    Every step runs on the frames of the backend: the event log is converted to a dataframe only at the end.
+
+    Parameters:
+        list_log_df (list): the event logs of the files (frames of the backend or paths of the frames spilled to disk).
+        list_cig (list): the IDs (CIG) of the tenders to be kept.
+        date_format (str): the format of the timestamps (None to take the one of the first timestamp).
+
+    Returns:
+        pd.DataFrame: the ordered event log with the case length.
+    """
+    # Only keeps events whose case_id is also in the tender cig list (before merging, so that only the kept events are copied)
+    list_log_df_cig = []
+    for df_log in list_log_df:
+        if isinstance(df_log, Path):
+            df_log = pd.read_pickle(df_log)
+        list_log_df_cig.append(backend.semi_join(backend.from_pandas(df_log), list_cig, 'case_id'))
+    df_log_1 = backend.concat(list_log_df_cig)
+    del list_log_df_cig
+
+    df_log_1 = backend.to_datetime(df_log_1, 'event_timestamp', date_format)
+
+    # Fix column types / nan
+    # df_log_1['asta_elettronica'] = df_log_1['asta_elettronica'].fillna("0")
+    # df_log_1['asta_elettronica'] = df_log_1['asta_elettronica'].replace({'0.0': '0', '1.0': '1'})
+    # df_log_1['asta_elettronica'] = df_log_1['asta_elettronica'].astype(int)
+
+    # Order
+    df_log_2 = backend.sort(df_log_1, ['case_id', 'event_timestamp'])
+
+    # Add case length
+    df_log_2 = backend.group_count(df_log_2, 'case_id', 'case_len')
+
+    # Filter
+    # Selection of the first event for each case_id
+    first_events = backend.group_agg(df_log_2, 'case_id', {'event_name': 'first'})
+
+    # Filtering of case_ids whose first event is 'TENDER_NOTICE'
+    valid_case_ids = first_events[first_events['event_name'] == 'TENDER_NOTICE']['case_id']
+
+    # Filtering the event log to keep only valid case_ids
+    df_log_2 = backend.semi_join(df_log_2, list(valid_case_ids), 'case_id')
+
+    return backend.to_pandas(df_log_2)
+
+def date_format_first(df_log: pd.DataFrame) -> str:
+    """
+    Returns the format of the first timestamp of an event log, as guessed by pd.to_datetime for the whole column.
+
+    Parameters:
+        df_log (pd.DataFrame): the event log (or the first part of it with a timestamp).
+
+    Returns:
+        str: the format ('mixed' if it cannot be guessed: every timestamp is parsed on its own), None if there is no timestamp.
+    """
+    for value in df_log["event_timestamp"].dropna():
+        if isinstance(value, str) and value not in ["", "NaT", "now", "today"]:
+            return guess_datetime_format(value) or "mixed"
+    return None
+
+def merge_event_log_partitions(list_log_df: list, list_cig: list, df_case_attr: pd.DataFrame, partitions_num: int, spill_dir: Path) -> pd.DataFrame:
+    """
+    Merges and finalises the event logs of the files in bounded memory: the events are split in partitions by ranges of case IDs (all the events of a case in the same partition) saved to disk, then every partition is merged, ordered and finalised on its own (see merge_event_log and finalize_event_log).
+    The partitions follow the order of the case IDs and their timestamps are parsed with the same format, so the final event log is the one of a single merge.
+
+    Parameters:
+        list_log_df (list): the event logs of the files (frames of the backend or paths of the frames spilled to disk), released while they are split.
+        list_cig (list): the IDs (CIG) of the tenders to be kept.
+        df_case_attr (pd.DataFrame): the case attributes from the lookup datasets, indexed by case ID (see enrich_cases).
+        partitions_num (int): the number of partitions.
+        spill_dir (Path): the directory of the partitions.
+
+    Returns:
+        pd.DataFrame: the final event log.
+    """
+    bounds = case_partition_bounds(list_cig, partitions_num)
+    print(f"Merging the event log in partitions of cases: {len(bounds) + 1}")
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    set_cig = set(list_cig)
+    date_format = None
+    list_parts = [[] for _ in range(len(bounds) + 1)] # files of every partition (in the order of the event logs)
+    list_columns = [] # columns of the merged event log (in the order of the event logs): a partition may miss the events of some files
+    for log_pos in range(len(list_log_df)):
+        df_log = list_log_df[log_pos]
+        list_log_df[log_pos] = None
+        if isinstance(df_log, Path):
+            path_spill = df_log
+            df_log = pd.read_pickle(path_spill)
+            path_spill.unlink()
+        df_log = backend.to_pandas(df_log)
+        df_log = df_log[df_log['case_id'].isin(set_cig)]
+        list_columns.extend(col for col in df_log.columns if col not in list_columns)
+        if date_format is None:
+            date_format = date_format_first(df_log)
+        partitions = df_case_partition(df_log, bounds)
+        for part_pos in np.unique(partitions):
+            path_part = spill_dir / f"part_{part_pos}_{log_pos}.pkl"
+            df_log[partitions == part_pos].to_pickle(path_part)
+            list_parts[part_pos].append(path_part)
+        del df_log
+
+    list_log_3 = []
+    df_log_empty = None
+    for list_paths in list_parts:
+        if len(list_paths) == 0:
+            continue
+        df_log_2 = merge_event_log(list_paths, list_cig, date_format)
+        for path_part in list_paths:
+            path_part.unlink()
+        df_log_2 = df_log_2.reindex(columns=list_columns + [col for col in df_log_2.columns if col not in list_columns])
+        if len(df_log_2) == 0:
+            # No case of the partition starts with the TENDER_NOTICE event
+            df_log_empty = df_log_2
+            continue
+        list_log_3.append(finalize_event_log(df_log_2, df_case_attr))
+        del df_log_2
+    if len(list_log_3) == 0:
+        return finalize_event_log(df_log_empty if df_log_empty is not None else pd.DataFrame(columns=list_columns + ["case_len"]), df_case_attr)
+    return pd.concat(list_log_3, ignore_index=True)
+
+def finalize_event_log(df_log_2: pd.DataFrame, df_case_attr: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Adds the trace attributes to all the events and removes the unclassified regions.
+    Every step works case by case: it can run on a part of the ordered event log with all the events of its cases.
+
+    Parameters:
+        df_log_2 (pd.DataFrame): the ordered event log with the cases starting with the TENDER_NOTICE event (see merge_event_log).
+        df_case_attr (pd.DataFrame): the case attributes from the lookup datasets, indexed by case ID (see enrich_cases).
+
+    Returns:
+        pd.DataFrame: the final event log.
+    """
+    df_log_3 = df_log_2
+
+    # Add trace attributes to all the rows
+    columns_to_fill = ["oggetto_principale_contratto", "importo_lotto", "accordo_quadro", "cpv_division", "sezione_regionale", "cod_tipo_scelta_contraente", "cod_modalita_realizzazione"]
+    # df_log_3 = df_log_3.groupby('case_id').apply(lambda group: fill_group_values(group, columns_to_fill))
+    df_log_3 = fill_group_values(df_log_3, columns_to_fill)
+
+    # Removes 'UNCLASSIFIED' regions
+    list_region_remove = ["NON CLASSIFICATO"]
+    df_log_3 = df_log_3[~df_log_3['sezione_regionale'].isin(list_region_remove)]
+
+    # Add the case attributes from the lookup datasets (a lookup by case ID, before the case length)
+    if df_case_attr is not None:
+        df_log_3 = df_log_3.copy()
+        for col in df_case_attr.columns:
+            df_log_3.insert(df_log_3.columns.get_loc("case_len"), col, df_log_3["case_id"].map(df_case_attr[col]))
+
+    return df_log_3
+
+def build_event_log(checkpoint_do: bool = False, resume_do: bool = False) -> pd.DataFrame:
+    """
+    Creates the event log from the Open Data catalogue (without saving it).
+
+    Parameters:
+        checkpoint_do (bool): True to save every stage in the checkpoint directory.
+        resume_do (bool): True to resume the last run from its last completed stage (implies checkpoint_do).
+
+    Returns:
+        pd.DataFrame: the final event log.
+    """
     print(">> Preparing output directories")
     check_and_create_directory(stats_dir)
     check_and_create_directory(log_dir)
@@ -201,156 +655,152 @@ def main():
     print("File (event log columns):", conf_file_log)
     list_col_log_dic = json_to_list_dict(conf_file_log)
     # print(list_col_log_dic) # debug
+
+    print("File (enrichment datasets):", conf_file_enrich)
+    list_col_enrich_dic = json_to_list_dict(conf_file_enrich)
+    # print(list_col_enrich_dic) # debug
     print()
 
+    # Checkpoints: every stage is saved in the run directory and a resumed run restarts from the last completed stage (a sampled run has its own directory)
+    run_dir = Path(checkpoint_dir) / Path(file_log_out).stem
+    if sample_fraction > 0:
+        run_dir = Path(checkpoint_dir) / f"{Path(file_log_out).stem}_sample_{sample_fraction}_{sample_seed}"
+    stage_enriched = "enriched" # case attributes from the lookup datasets
+    stage_merged = "merged"     # merged and ordered event log
+    stage_final = "event_log"   # final event log
+    list_stages = []            # stages already completed
+    if checkpoint_do or resume_do:
+        checkpoint_do = True
+        print(">> Preparing checkpoints")
+        print("Directory:", run_dir)
+        list_inputs = [od_file_source(od_anac_dir, file_od)[0] for file_od in list_od_files] + [conf_file_cols_type, conf_file_stats_inc, conf_file_filters, conf_file_log, conf_file_enrich]
+        list_stages = checkpoint_open(run_dir, checkpoint_fingerprint(list_inputs, {key: yaml_config.get(key) for key in list_checkpoint_keys}), resume_do)
+        print(f"Stages completed ({len(list_stages)}):", list_stages)
+        print()
+
     print(">> Reading Open Data files")
+    if sample_fraction > 0:
+        print(f"Warning: sampling {sample_fraction} of the cases, the event logs are not complete")
     
-    list_log_df = []            # event log created for every dataframe
+    list_log_df = []            # event log created for every dataframe, as a frame of the backend (or its path, if spilled to disk)
     list_log_df_mapping = []    # event log features for every dataframe
     list_cig = []               # IDs of tenders
-
-    for file_od in list_od_files:
-        # File info
-        print("> Reading file")
-        print("File:", file_od)
-        file_path = Path(file_od)
-        file_stem = file_path.stem # get the name without extension (is also the event name)
-
-        # Get the columns to be included in stats by file name
-        list_col_stats_inc = get_values_from_dict_list(list_col_stats_dic, file_od)
-        list_col_stats_inc_len = len(list_col_stats_inc)
-
-        # Get the columns to be filtered by file name
-        list_col_filters = get_values_from_dict_list(list_col_filters_dic, file_od)
-        list_col_filters_len = len(list_col_filters)
-
-        # Read the file (dataset)
-        list_col_exc = [] # no columns to exclude
-        df_od = df_read_csv(od_anac_dir, file_od, list_col_exc, list_col_type_dic, None, csv_sep)
-        df_print_details(df_od, f"File '{file_od}'")
-        print()
-
-        # For the main file tender_notice:
-        # add the column "cpv_division" that takes the first two characters of "cod_cpv" if it's not null
-        # add the column "accordo_quadro" (1 or 0)
-        # from the column "settore" remove redundant "SETTORI "string
-        if file_od == tender_main_file:
-            print(f"> Updating main tender file '{file_od}'")
-            df_od['cpv_division'] = df_od['cod_cpv'].apply(lambda x: x[:2] if pd.notnull(x) else None)
-            df_od['accordo_quadro'] = df_od['cig_accordo_quadro'].apply(lambda x: "1" if pd.notna(x) else "0")
-            df_od['accordo_quadro'] = df_od['accordo_quadro'].astype('object')
-            df_od['settore'] = df_od['settore'].str.replace('SETTORI ', '')
-            df_od['sezione_regionale'] = df_od['sezione_regionale'].str.replace('SEZIONE REGIONALE  ', '')
-            df_od['sezione_regionale'] = df_od['sezione_regionale'].str.replace('SEZIONE REGIONALE ', '')
-            df_od['sezione_regionale'] = df_od['sezione_regionale'].str.replace('PROVINCIA AUTONOMA DI', 'PA')
-            df_od['oggetto_principale_contratto'] = df_od['oggetto_principale_contratto'].str.replace('FORNITURE', 'U') # sUpplies
-            df_od['oggetto_principale_contratto'] = df_od['oggetto_principale_contratto'].str.replace('SERVIZI', 'S') # Services
-            df_od['oggetto_principale_contratto'] = df_od['oggetto_principale_contratto'].str.replace('LAVORI', 'W') # Work
-            df_print_details(df_od, f"File '{file_od}' (after cleaning)")
-
-        if stats_do == 1:
-            # Stats 1 - Missing values
-            print(">> Creating stats")
-            print("> Missing values")
-            dic_od = summarize_dataframe_to_dict(df_od, file_od)
-            # print(dic_od) # debug
-            df_stats = summarize_dataframe_to_df(dic_od)
-            # print(df_stats.head()) # debug
-            print("> Saving stats")
-            save_stats(df_stats, file_stem, "_stats_missing", stats_dir)
-            print()
-
-            # Stats 2 - Distinct values
-            print("> Distinct values")
-            print("Colums included for this stat:", list_col_stats_inc_len)
-            print(list_col_stats_inc) # debug
-            if list_col_stats_inc_len > 0:
-                df_stats = distinct_values_frequencies(df_od, list_col_stats_inc)
-                # print(df_stats.head()) # debug
-                print("> Saving stats")
-                save_stats(df_stats, file_stem, "_stats_distinct", stats_dir)
-            print()
-
-        # Filters
-        if file_od == tender_main_file and list_col_filters_len > 0:
-            print(">> Applying filters")
-            print(f"Filters applied ({list_col_filters_len}):", list_col_filters)
-            for filter_dict in list_col_filters:
-                for key, value in filter_dict.items():
-                    # print("Distinct values before filtering:", list(df_od[key].unique())) # debug
-                    # print("Filter key:", key, "filter value:", value) # debug
-                    df_od = df_od[df_od[key].isin(value)]
-                    # print("DF size after filter:", df_od.shape) # debug
-            df_print_details(df_od, f"File '{file_od}' (after filtering)")
-            # Create list of ids (cig) to be kept in event log
-            list_cig = list(df_od["cig"].unique())
-            # list_cig
-            print()
-
-        # Create the log for this dataframe
-        print("> Extracting event log data")
-        # Get the columns to be filtered by file name
-        list_col_log = get_values_from_dict_list(list_col_log_dic, file_od)
-        list_col_log_len = len(list_col_log)
-        print(f"Features for this dataframe ({list_col_log_len}): {list_col_log}")
-        if list_col_log_len > 0:
-            print("Event log for event:", file_stem)
-            dic_log = create_event_log_dict(df_od, list_col_log, file_stem)
-            if "error" not in dic_log:
-                df_log = pd.DataFrame(dic_log)
-                print("Event log shape:", df_log.shape)
+    df_case_keys = None         # case table with the keys of the lookup datasets
+    memory_log = 0              # memory used by the event logs kept in memory
+    memory_log_total = 0        # memory used by all the event logs (also the ones spilled to disk)
+    spill_dir = Path(checkpoint_dir) / "spill" # event logs spilled to disk (with a memory budget)
+
+    if stage_merged not in list_stages and stage_final not in list_stages:
+        # With a sample, the main tender file is read first and only the rows of its sampled tenders are read from the other files
+        list_od_files_run = list_od_files
+        if sample_fraction > 0 and tender_main_file in list_od_files:
+            list_od_files_run = [tender_main_file] + [file_od for file_od in list_od_files if file_od != tender_main_file]
+        list_log_pos = [] # position of every event log in the catalogue (the event logs are merged in the order of the catalogue)
+        for file_od in list_od_files_run:
+            stage_extract = f"extract_{Path(file_od).stem}"
+            if stage_extract in list_stages:
+                print("> Resuming file")
+                print("File:", file_od)
+                df_log, list_col_log, list_cig_od, df_case_keys_od = checkpoint_load(run_dir, stage_extract)
+            else:
+                list_cig_keep = list_cig if sample_fraction > 0 and file_od != tender_main_file else None
+                df_log, list_col_log, list_cig_od, df_case_keys_od = od_file_to_log(file_od, list_col_type_dic, list_col_stats_dic, list_col_filters_dic, list_col_log_dic, list_col_enrich_dic, list_cig_keep)
+                if checkpoint_do:
+                    checkpoint_save(run_dir, stage_extract, (df_log, list_col_log, list_cig_od, df_case_keys_od))
+            if list_cig_od is not None:
+                list_cig = list_cig_od
+            if df_case_keys_od is not None:
+                df_case_keys = df_case_keys_od
+            if df_log is not None:
+                # The event logs are kept in the frames of the backend until the merge (e.g., Arrow tables, more compact than the text columns of pandas)
+                df_log = backend.from_pandas(df_log)
+                # With a memory budget, the event logs not fitting in the budget are spilled to disk until the merge
+                if memory_budget is not None:
+                    memory_log_total += backend.memory_bytes(df_log)
+                if memory_budget is not None and memory_log + backend.memory_bytes(df_log) > memory_budget * MEMORY_SHARE_DATA:
+                    spill_dir.mkdir(parents=True, exist_ok=True)
+                    path_spill = spill_dir / f"{Path(file_od).stem}.pkl"
+                    print("Event log spilled to disk:", path_spill)
+                    pd.to_pickle(df_log, path_spill)
+                    df_log = path_spill
+                elif memory_budget is not None:
+                    memory_log += backend.memory_bytes(df_log)
                 list_log_df.append(df_log)
                 list_log_df_mapping.append(list_col_log)
-        print("-"*3)
-        print()
+                list_log_pos.append(list_od_files.index(file_od))
+            print("-"*3)
+            print()
+        list_log_order = sorted(range(len(list_log_pos)), key=lambda log_pos: list_log_pos[log_pos])
+        list_log_df = [list_log_df[log_pos] for log_pos in list_log_order]
+        list_log_df_mapping = [list_log_df_mapping[log_pos] for log_pos in list_log_order]
 
     print()
 
+    # Case attributes from the lookup datasets
+    df_case_attr = None
+    if stage_final not in list_stages:
+        if stage_enriched in list_stages:
+            df_case_attr = checkpoint_load(run_dir, stage_enriched)
+        elif df_case_keys is not None:
+            print(">> Enriching the cases")
+            df_case_attr = enrich_cases(df_case_keys, list_col_enrich_dic, list_od_files, list_col_type_dic)
+            del df_case_keys
+            if checkpoint_do:
+                checkpoint_save(run_dir, stage_enriched, df_case_attr)
+            print()
+
     # Final event log
     print(">> Merging the final event log")
-    df_log_1 = pd.concat(list_log_df, ignore_index=True)
-    
-    df_log_1 = df_log_1[df_log_1['case_id'].isin(list_cig)] # Only keeps events whose case_id is also in the tender cig list 
+    if stage_final in list_stages:
+        df_log_3 = checkpoint_load(run_dir, stage_final)
+    else:
+        # With a memory budget, the events not fitting in the budget are merged and finalised by partitions of cases (the merged stage is not saved)
+        partitions_num = 1
+        if memory_budget is not None and stage_merged not in list_stages:
+            partitions_num = int(np.ceil(memory_log_total / (memory_budget * MEMORY_SHARE_PARTITION)))
+        if partitions_num > 1:
+            df_log_3 = merge_event_log_partitions(list_log_df, list_cig, df_case_attr, partitions_num, spill_dir)
+        else:
+            if stage_merged in list_stages:
+                df_log_2 = checkpoint_load(run_dir, stage_merged)
+            else:
+                df_log_2 = merge_event_log(list_log_df, list_cig)
+                for path_spill in [df_log for df_log in list_log_df if isinstance(df_log, Path)]:
+                    path_spill.unlink()
+                if checkpoint_do:
+                    checkpoint_save(run_dir, stage_merged, df_log_2)
+            df_log_3 = finalize_event_log(df_log_2, df_case_attr)
+            del df_log_2
+        del list_log_df
+        if checkpoint_do:
+            checkpoint_save(run_dir, stage_final, df_log_3)
 
-    df_log_1['event_timestamp'] = pd.to_datetime(df_log_1['event_timestamp'])
-    
-    # Fix column types / nan
-    # df_log_1['asta_elettronica'] = df_log_1['asta_elettronica'].fillna("0")
-    # df_log_1['asta_elettronica'] = df_log_1['asta_elettronica'].replace({'0.0': '0', '1.0': '1'})
-    # df_log_1['asta_elettronica'] = df_log_1['asta_elettronica'].astype(int)
-
-    # Order
-    df_log_2 = df_log_1.sort_values(by=['case_id', 'event_timestamp'])
-
-    # Add case length
-    df_log_2['case_len'] = df_log_2.groupby('case_id')['case_id'].transform('count')
-
-    # Filter
-    # Selection of the first event for each case_id
-    first_events = df_log_2.groupby('case_id').first().reset_index()
-
-    # Filtering of case_ids whose first event is 'TENDER_NOTICE'
-    valid_case_ids = first_events[first_events['event_name'] == 'TENDER_NOTICE']['case_id']
+    # Print
+    df_print_details(df_log_3, f"Event log")
 
-    # Filtering the original DataFrame to keep only valid case_ids
-    df_log_3 = df_log_2[df_log_2['case_id'].isin(valid_case_ids)]
+    return df_log_3
 
-    # Add trace attributes to all the rows
-    columns_to_fill = ["oggetto_principale_contratto", "importo_lotto", "accordo_quadro", "cpv_division", "sezione_regionale", "cod_tipo_scelta_contraente", "cod_modalita_realizzazione"]
-    # df_log_3 = df_log_3.groupby('case_id').apply(lambda group: fill_group_values(group, columns_to_fill))
-    df_log_3 = fill_group_values(df_log_3, columns_to_fill)
-
-    # Removes 'UNCLASSIFIED' regions
-    list_region_remove = ["NON CLASSIFICATO"]
-    df_log_3 = df_log_3[~df_log_3['sezione_regionale'].isin(list_region_remove)]
+def save_event_log(df_log_3: pd.DataFrame) -> None:
+    """
+    Saves the event log, its bitmap index and the list of its case IDs.
 
-    # Print
-    df_print_details(df_log_3, f"Event log")
+    Parameters:
+        df_log_3 (pd.DataFrame): the final event log (see build_event_log).
 
+    Returns:
+        None
+    """
     # Save the event log
     path_log = Path(log_dir) / file_log_out
     print("Saving final event log to:", path_log)
-    df_log_3.to_csv(path_log, sep=csv_sep, index=False, quoting=csv.QUOTE_MINIMAL)
+    path_log_out = backend.write_csv(df_log_3, path_log, csv_sep, csv.QUOTE_MINIMAL, csv_write_compression, csv_write_workers, csv_write_chunk_rows)
+    print()
+
+    # Save the bitmap index of the trace attributes (for fast slicing of the event log)
+    path_index = bitmap_index_path(path_log)
+    print("Saving event log index to:", path_index)
+    index_log = bitmap_index_build(df_log_3, list_index_cols, index_amount_col, list_index_amount_bounds)
+    bitmap_index_save(index_log, path_index, path_log_out)
     print()
 
     # Save the list of CIG (case-id) of the event log (to be searche in TED texts)
@@ -358,8 +808,23 @@ def main():
     df_print_details(df_log_3_cig, f"Case IDs")
     path_log = Path(log_dir) / file_log_caseids_out
     print("Saving final event log Case IDs to:", path_log)
-    df_log_3_cig.to_csv(path_log, sep=csv_sep, index=False, quoting=csv.QUOTE_MINIMAL)
+    backend.write_csv(df_log_3_cig, path_log, csv_sep, csv.QUOTE_MINIMAL, csv_write_compression, csv_write_workers, csv_write_chunk_rows)
+    print()
+
+### MAIN ###
+
+def main(checkpoint_do: bool = False, resume_do: bool = False):
     print()
+    print(f"*** PROGRAM START ({script_name}) ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    print()
+
+    df_log_3 = build_event_log(checkpoint_do, resume_do)
+
+    save_event_log(df_log_3)
 
     # Program end
     end_time = datetime.now().replace(microsecond=0)
@@ -376,4 +841,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Creates the event log from the ANAC Open Data catalogue")
+    parser.add_argument("--checkpoint", action="store_true", help="save every stage in the checkpoint directory (CHECKPOINT_DIR)")
+    parser.add_argument("--resume", action="store_true", help="resume the last run from its last completed stage (implies --checkpoint)")
+    args = parser.parse_args()
+    main(args.checkpoint, args.resume)
\ No newline at end of file
@@ -3,13 +3,19 @@
 
 ### IMPORT ###
 import pandas as pd
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 import csv
 
 ### LOCAL IMPORT ###
 from config import config_reader
-from utility_manager.utilities import df_read_csv, df_print_details, script_info
+from utility_manager.utilities import df_print_details, script_info
+from utility_manager.memory_budget import memory_budget_bytes, csv_chunk_rows
+from utility_manager.bitmap_index import bitmap_index_path, bitmap_index_build, bitmap_index_save
+from utility_manager.duration_stats import thresholds_bounds
+from utility_manager.csv_writer import csv_workers_count
+from utility_manager.backends import execution_backend
 
 ### GLOBALS ###
 yaml_config = config_reader.config_read_yaml("config.yml", "config")
@@ -19,6 +25,15 @@ csv_sep = str(yaml_config["CSV_FILE_SEP"])
 stats_dir =  str(yaml_config["OD_STATS_DIR"])
 
 log_dir =  str(yaml_config["EVENT_LOG_DIR"])
+memory_budget = memory_budget_bytes(yaml_config["MEMORY_BUDGET_MB"]) # None if there is no budget
+memory_sample_rows = int(yaml_config["MEMORY_SAMPLE_ROWS"])
+csv_write_workers = csv_workers_count(yaml_config["CSV_WRITE_WORKERS"]) # processes formatting the event logs
+csv_write_chunk_rows = int(yaml_config["CSV_WRITE_CHUNK_ROWS"])
+csv_write_compression = str(yaml_config["CSV_WRITE_COMPRESSION"])
+backend = execution_backend(str(yaml_config["EXECUTION_BACKEND"])) # core operations (read, semi-join, concat, sort, group, write)
+list_index_cols = list(yaml_config["INDEX_COLS"])
+index_amount_col = str(yaml_config["INDEX_AMOUNT_COL"])
+list_index_amount_bounds = thresholds_bounds(dict(yaml_config["THRESHOLDS"])) # bounds of the amount buckets
 
 file_event_log = "anac_log_2016_2022.csv" # INPUT: the main event log
 
@@ -67,28 +82,38 @@ def filter_cases_by_events(df: pd.DataFrame) -> pd.DataFrame:
     # Return the filtered DataFrame
     return df_filtered
 
-### MAIN ###
-
-def main():
-    print()
-    print(f"*** PROGRAM START ({script_name}) ***")
-    print()
-
-    start_time = datetime.now().replace(microsecond=0)
-    print("Start process: " + str(start_time))
-    print()
+def read_event_log() -> pd.DataFrame:
+    """
+    Reads the complete event log created by 01_data_to_log.py.
 
+    Returns:
+        pd.DataFrame: the event log.
+    """
     print(">> Reading complete event log")
     list_col_exc = []
-    list_col_type_dic = {"case_id":object,"event_name":object,"event_timestamp":object,"oggetto_principale_contratto":object, "importo_lotto":float, "accordo_quadro":object,"cpv_division":object,"sezione_regionale":object,"cod_tipo_scelta_contraente":object,"cod_modalita_realizzazione":object,"case_len":int}
+    # The other columns (e.g., the case attributes from the lookup datasets) are read as text
+    list_col_type_dic = defaultdict(lambda: object, {"case_id":object,"event_name":object,"event_timestamp":object,"oggetto_principale_contratto":object, "importo_lotto":float, "accordo_quadro":object,"cpv_division":object,"sezione_regionale":object,"cod_tipo_scelta_contraente":object,"cod_modalita_realizzazione":object,"case_len":int})
 
-    df_log = df_read_csv(log_dir, file_event_log, list_col_exc, list_col_type_dic, None, csv_sep)
+    chunk_rows = csv_chunk_rows(log_dir, file_event_log, list_col_type_dic, memory_budget, memory_sample_rows, csv_sep)
+    df_log = backend.read_csv(log_dir, file_event_log, list_col_exc, list_col_type_dic, csv_sep, chunk_rows)
     df_print_details(df_log, f"File '{file_event_log}'")
     print()
 
     print("Regions inf event log:", df_log["sezione_regionale"].unique())
     print()
 
+    return df_log
+
+def filter_log_ted(df_log: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keeps only the cases of the event log whose case-id (CIG) is present in TED texts.
+
+    Parameters:
+        df_log (pd.DataFrame): the complete event log.
+
+    Returns:
+        pd.DataFrame: the event log with the cases from TED, ordered by case and timestamp.
+    """
     """
     print(">> Filtering event log by events (initial and final)")
     df_log = filter_cases_by_events(df_log)
@@ -114,16 +139,53 @@ def main():
 
     # Keep only cases from TED
     print(">> Filtering event log by events (initial and final)")
-    df_log_ted = df_log[df_log['case_id'].isin(list_cig_ted)]
-    df_log_ted = df_log_ted.sort_values(by=['case_id', 'event_timestamp']).reset_index(drop=True)
+    df_log_ted = backend.semi_join(backend.from_pandas(df_log), list_cig_ted, 'case_id')
+    df_log_ted = backend.to_pandas(backend.sort(df_log_ted, ['case_id', 'event_timestamp'])).reset_index(drop=True)
     df_print_details(df_log_ted, f"Filtered")
     print("Filtere vent log cases:", df_log_ted["case_id"].nunique())
     print()
 
+    return df_log_ted
+
+def save_log_ted(df_log_ted: pd.DataFrame) -> dict:
+    """
+    Saves the event log with the cases from TED and its bitmap index.
+
+    Parameters:
+        df_log_ted (pd.DataFrame): the event log with the cases from TED (see filter_log_ted).
+
+    Returns:
+        dict: the bitmap index of the event log.
+    """
     # Save
     path_anac_ted = Path(log_dir) / file_event_log_ted
     print("Saving filtered event log to:", path_anac_ted)
-    df_log_ted.to_csv(path_anac_ted, sep=";", index=False)
+    path_anac_ted_out = backend.write_csv(df_log_ted, path_anac_ted, ";", csv.QUOTE_MINIMAL, csv_write_compression, csv_write_workers, csv_write_chunk_rows)
+
+    # Save the bitmap index of the trace attributes (used by 03_log_filter_threshold.py)
+    path_index = bitmap_index_path(path_anac_ted)
+    print("Saving filtered event log index to:", path_index)
+    index_log = bitmap_index_build(df_log_ted, list_index_cols, index_amount_col, list_index_amount_bounds)
+    bitmap_index_save(index_log, path_index, path_anac_ted_out)
+
+    return index_log
+
+### MAIN ###
+
+def main():
+    print()
+    print(f"*** PROGRAM START ({script_name}) ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    print()
+
+    df_log = read_event_log()
+
+    df_log_ted = filter_log_ted(df_log)
+
+    save_log_ted(df_log_ted)
 
     # Program end
     end_time = datetime.now().replace(microsecond=0)
@@ -3,6 +3,7 @@
 
 ### IMPORT ###
 import pandas as pd
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 import csv
@@ -10,7 +11,12 @@ from dateutil.relativedelta import relativedelta
 
 ### LOCAL IMPORT ###
 from config import config_reader
-from utility_manager.utilities import df_read_csv, df_print_details, script_info
+from utility_manager.utilities import od_file_source, df_print_details, script_info
+from utility_manager.memory_budget import memory_budget_bytes, csv_chunk_rows, df_case_chunks
+from utility_manager.duration_stats import thresholds_by_code, case_duration_table, duration_stats_update, duration_stats_merge, duration_stats_to_df
+from utility_manager.bitmap_index import bitmap_index_path, bitmap_index_load, bitmap_index_query, bitmap_index_slice
+from utility_manager.csv_writer import csv_workers_count
+from utility_manager.backends import execution_backend
 
 ### GLOBALS ###
 yaml_config = config_reader.config_read_yaml("config.yml", "config")
@@ -21,12 +27,29 @@ stats_dir =  str(yaml_config["OD_STATS_DIR"])
 
 log_dir =  str(yaml_config["EVENT_LOG_DIR"])
 
+memory_budget = memory_budget_bytes(yaml_config["MEMORY_BUDGET_MB"]) # None if there is no budget
+memory_sample_rows = int(yaml_config["MEMORY_SAMPLE_ROWS"])
+csv_write_workers = csv_workers_count(yaml_config["CSV_WRITE_WORKERS"]) # processes formatting the event logs
+csv_write_chunk_rows = int(yaml_config["CSV_WRITE_CHUNK_ROWS"])
+csv_write_compression = str(yaml_config["CSV_WRITE_COMPRESSION"])
+backend = execution_backend(str(yaml_config["EXECUTION_BACKEND"])) # core operations (read, semi-join, concat, sort, group, write)
+list_duration_dims = list(yaml_config["DURATION_STATS_DIMENSIONS"])
+list_duration_quantiles = [float(q) for q in yaml_config["DURATION_STATS_QUANTILES"]]
+dic_thresholds = dict(yaml_config["THRESHOLDS"]) # threshold amount by contract type
+dic_duration_thresholds = thresholds_by_code(dic_thresholds) # threshold amount by oggetto_principale_contratto
+duration_chunk_rows = int(yaml_config["DURATION_STATS_CHUNK_ROWS"])
+
 file_event_log_ted = "anac_log_2016_2022_ted.csv" # INPUT: the cases from TED texts (PDFs)
 
 script_path, script_name = script_info(__file__)
 
 ### FUNCTIONS ###
-def filter_df_by_region_and_amount(df:pd.DataFrame, region_list:list, amount: float) -> pd.DataFrame:
+def filter_df_by_region_and_amount(df:pd.DataFrame, region_list:list, amount: float, index_log: dict = None) -> pd.DataFrame:
+    # With the bitmap index of the event log (and the amount as bucket bound) the slices are selected without scanning the dataframe
+    if index_log is not None and float(amount) in index_log["amount_bounds"]:
+        df_log_3_a = bitmap_index_slice(df, bitmap_index_query(index_log, {"sezione_regionale": region_list}, amount_gt=amount))
+        df_log_3_b = bitmap_index_slice(df, bitmap_index_query(index_log, {"sezione_regionale": region_list}, amount_le=amount))
+        return df_log_3_a, df_log_3_b
     df_log_3_r = df[df['sezione_regionale'].isin(region_list)]
     df_log_3_a = df_log_3_r[df_log_3_r['importo_lotto'] > amount]
     df_log_3_b = df_log_3_r[df_log_3_r['importo_lotto'] <= amount]
@@ -89,28 +112,45 @@ def calculate_case_statistics(df_log: pd.DataFrame, output_csv: str) -> None:
     # Save the final statistics to a CSV file
     stats.to_csv(output_csv, sep=csv_sep, index=False)
 
-### MAIN ###
-
-def main():
-    print()
-    print(f"*** PROGRAM START ({script_name}) ***")
-    print()
-
-    start_time = datetime.now().replace(microsecond=0)
-    print("Start process: " + str(start_time))
-    print()
+def read_log_ted() -> tuple:
+    """
+    Reads the event log with the cases from TED (created by 02_log_filter_TED.py) and its bitmap index.
 
+    Returns:
+        tuple: the event log and its bitmap index (None if missing or stale).
+    """
     print(">> Reading complete event log")
     list_col_exc = []
-    list_col_type_dic = {"case_id":object,"event_name":object,"event_timestamp":object,"oggetto_principale_contratto":object, "importo_lotto":float, "accordo_quadro":object,"cpv_division":object,"sezione_regionale":object,"cod_tipo_scelta_contraente":object,"cod_modalita_realizzazione":object,"case_len":int}
+    # The other columns (e.g., the case attributes from the lookup datasets) are read as text
+    list_col_type_dic = defaultdict(lambda: object, {"case_id":object,"event_name":object,"event_timestamp":object,"oggetto_principale_contratto":object, "importo_lotto":float, "accordo_quadro":object,"cpv_division":object,"sezione_regionale":object,"cod_tipo_scelta_contraente":object,"cod_modalita_realizzazione":object,"case_len":int})
 
-    df_log = df_read_csv(log_dir, file_event_log_ted, list_col_exc, list_col_type_dic, None, csv_sep)
+    chunk_rows = csv_chunk_rows(log_dir, file_event_log_ted, list_col_type_dic, memory_budget, memory_sample_rows, csv_sep)
+    df_log = backend.read_csv(log_dir, file_event_log_ted, list_col_exc, list_col_type_dic, csv_sep, chunk_rows)
     df_print_details(df_log, f"File '{file_event_log_ted}'")
     print()
 
     print("Regions inf event log:", df_log["sezione_regionale"].unique())
     print()
 
+    path_index = bitmap_index_path(Path(log_dir) / file_event_log_ted)
+    print(">> Reading event log index:", path_index)
+    index_log = bitmap_index_load(path_index, od_file_source(log_dir, file_event_log_ted)[0])
+    print("Index available:", index_log is not None)
+    print()
+
+    return df_log, index_log
+
+def save_log_threshold(df_log: pd.DataFrame, index_log: dict = None) -> None:
+    """
+    Divides the event log by amount (above/below threshold) for every type of contract and saves the parts.
+
+    Parameters:
+        df_log (pd.DataFrame): the event log with the cases from TED.
+        index_log (dict): the bitmap index of the event log (None to filter the dataframe).
+
+    Returns:
+        None
+    """
     # Filters above and below threshold
     print(">> Division by above/below threshold")
     print()
@@ -127,13 +167,12 @@ def main():
     print(f"List central ({len(list_central)}):", list_central)
     print()
 
-    dic_thresholds = {"LAVORI": 5382000, "SERVIZI": 215000, "FORNITURE": 215000}
     for key, value in dic_thresholds.items():
         print("Key:", key)
         print("Value:", value)
         file_out_a = f"{Path(file_event_log_ted).stem}_{key}_above.csv"
         file_out_b = f"{Path(file_event_log_ted).stem}_{key}_below.csv"
-        df_log_3_a, df_log_3_b = filter_df_by_region_and_amount(df_log, list_regions, dic_thresholds[key])
+        df_log_3_a, df_log_3_b = filter_df_by_region_and_amount(df_log, list_regions, dic_thresholds[key], index_log)
         df_log_3_a = df_log_3_a.sort_values(by=['case_id', 'event_timestamp'])
         df_log_3_b = df_log_3_b.sort_values(by=['case_id', 'event_timestamp'])
         print("Above shape:", df_log_3_a.shape)
@@ -141,15 +180,55 @@ def main():
         path_log_a = Path(log_dir) / file_out_a
         path_log_b = Path(log_dir) / file_out_b
         print("Saving:", path_log_a)
-        df_log_3_a.to_csv(path_log_a, sep=csv_sep, index=False, quoting=csv.QUOTE_MINIMAL)
+        backend.write_csv(df_log_3_a, path_log_a, csv_sep, csv.QUOTE_MINIMAL, csv_write_compression, csv_write_workers, csv_write_chunk_rows)
         print("Saving:", path_log_b)
-        df_log_3_b.to_csv(path_log_b, sep=csv_sep, index=False, quoting=csv.QUOTE_MINIMAL)
+        backend.write_csv(df_log_3_b, path_log_b, csv_sep, csv.QUOTE_MINIMAL, csv_write_compression, csv_write_workers, csv_write_chunk_rows)
         print()
 
-    # Stats about case duration
+def save_case_statistics(df_log: pd.DataFrame) -> None:
+    """
+    Saves the stats about the case duration of the event log.
+
+    Parameters:
+        df_log (pd.DataFrame): the event log with the cases from TED.
+
+    Returns:
+        None
+    """
+    # Stats about case duration (exact, by oggetto_principale_contratto)
     print(">> Stats about case duration by oggetto_principale_contratto")
     path_stats = Path(log_dir) / "anac_log_2016_2022_duration_by_oggetto_contratto.csv"
     calculate_case_statistics(df_log, path_stats)
+    print()
+
+    # Stats about case duration by every dimension (one pass over the cases, chunk by chunk)
+    print(">> Stats about case duration by dimension")
+    print(f"Dimensions ({len(list_duration_dims)}):", list_duration_dims)
+    dic_stats = {}
+    for df_log_chunk in df_case_chunks(df_log, duration_chunk_rows):
+        df_cases = case_duration_table(df_log_chunk, list_duration_dims, dic_duration_thresholds)
+        dic_stats = duration_stats_merge(dic_stats, duration_stats_update({}, df_cases, list_duration_dims))
+    df_stats = duration_stats_to_df(dic_stats, list_duration_quantiles)
+    path_stats = Path(log_dir) / "anac_log_2016_2022_duration_by_dimension.csv"
+    print("Saving:", path_stats)
+    df_stats.to_csv(path_stats, sep=csv_sep, index=False)
+
+### MAIN ###
+
+def main():
+    print()
+    print(f"*** PROGRAM START ({script_name}) ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    print()
+
+    df_log, index_log = read_log_ted()
+
+    save_log_threshold(df_log, index_log)
+
+    save_case_statistics(df_log)
     
     # Program end
     end_time = datetime.now().replace(microsecond=0)
@@ -0,0 +1,224 @@
+# log_service.py
+# Keeps an event log in memory with its indexes and answers slice, case and aggregate queries through a local HTTP API (JSON)
+
+### IMPORT ###
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+from datetime import datetime
+import argparse
+import json
+import threading
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.utilities import script_info
+from utility_manager.duration_stats import thresholds_by_code, thresholds_bounds
+from utility_manager.log_store import log_store_load, log_store_changed, log_store_slice, log_store_events, log_store_cases, log_store_aggregate
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", "config")
+# print(yaml_config) # debug
+csv_sep = str(yaml_config["CSV_FILE_SEP"])
+
+log_dir =  str(yaml_config["EVENT_LOG_DIR"])
+list_index_cols = list(yaml_config["INDEX_COLS"])
+index_amount_col = str(yaml_config["INDEX_AMOUNT_COL"])
+dic_thresholds = dict(yaml_config["THRESHOLDS"]) # threshold amount by contract type
+list_index_amount_bounds = thresholds_bounds(dic_thresholds) # bounds of the amount buckets
+dic_duration_thresholds = thresholds_by_code(dic_thresholds) # threshold amount by oggetto_principale_contratto
+service_host = str(yaml_config["SERVICE_HOST"])
+service_port = int(yaml_config["SERVICE_PORT"])
+service_cache_size = int(yaml_config["SERVICE_CACHE_SIZE"])
+service_rows_limit = int(yaml_config["SERVICE_ROWS_LIMIT"])
+
+file_event_log = "anac_log_2016_2022.csv" # INPUT: the main event log (default)
+
+# Query parameters that are not filters on the columns
+LIST_PARAMS = ["cig", "by", "amount_gt", "amount_le", "min_duration", "max_duration", "limit"]
+
+script_path, script_name = script_info(__file__)
+
+### CLASSES ###
+
+class LogReloadError(Exception):
+    """
+    The changed event log could not be loaded (e.g., it is being replaced): the previous one is kept.
+    """
+
+class LogService:
+    """
+    The resident event log: the store with the indexes (reloaded when the file changes) and the LRU cache of the query results.
+    """
+    def __init__(self, dir_name: str, file_name: str, cache_size: int):
+        self.dir_name = dir_name
+        self.file_name = file_name
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.store = None
+        self.reload()
+
+    def reload(self) -> None:
+        """
+        Loads the event log and empties the cache.
+        """
+        start_time = datetime.now()
+        print(f"Loading the event log '{self.file_name}' from '{self.dir_name}'")
+        self.store = log_store_load(self.dir_name, self.file_name, list_index_cols, index_amount_col, list_index_amount_bounds, dic_duration_thresholds, csv_sep)
+        self.cache.clear()
+        print(f"Event log loaded: {len(self.store['df'])} events, {len(self.store['cases'])} cases ({datetime.now() - start_time})")
+
+    def query(self, path: str, dic_params: dict) -> dict:
+        """
+        Answers a query from the cache or the store (reloading the event log first if its file has changed).
+        If the reload fails, LogReloadError is raised and the previous store is kept (the reload is tried again at the next query).
+
+        Parameters:
+            path (str): the endpoint ('/status', '/events', '/slice', '/cases' or '/aggregate').
+            dic_params (dict): the query parameters (lists of values).
+
+        Returns:
+            dict: the result (JSON serialisable).
+        """
+        with self.lock:
+            if log_store_changed(self.store):
+                try:
+                    self.reload() # the store is replaced only when the load succeeds
+                except (OSError, ValueError) as exc:
+                    raise LogReloadError(f"The event log '{self.file_name}' is being replaced, retry later ({exc})") from exc
+            cache_key = (path, tuple(sorted((key, tuple(values)) for key, values in dic_params.items())))
+            if cache_key in self.cache:
+                self.cache.move_to_end(cache_key)
+                return self.cache[cache_key]
+            store = self.store
+        result = query_store(store, path, dic_params)
+        with self.lock:
+            if store is self.store: # results of a replaced event log are not cached
+                self.cache[cache_key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return result
+
+class LogRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the GET requests of the API (the service is set on the server).
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        dic_params = {}
+        for key, value in parse_qsl(url.query):
+            dic_params.setdefault(key, []).extend(item for item in value.split(",") if item != "")
+        try:
+            result = self.server.service.query(url.path.rstrip("/") or "/", dic_params)
+            status = 200
+        except LogReloadError as exc:
+            result, status = {"error": str(exc)}, 503
+        except (KeyError, ValueError) as exc:
+            result, status = {"error": str(exc).strip("'\"")}, 400
+        body = json.dumps(result, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+### FUNCTIONS ###
+
+def param_value(dic_params: dict, key: str, default=None):
+    """
+    Returns the single value of a query parameter.
+
+    Parameters:
+        dic_params (dict): the query parameters (lists of values).
+        key (str): the parameter.
+        default: the value if the parameter is missing.
+
+    Returns:
+        The value of the parameter (the last one if repeated).
+    """
+    list_values = dic_params.get(key, [])
+    return list_values[-1] if len(list_values) > 0 else default
+
+def df_to_records(df, limit: int) -> dict:
+    """
+    Converts a query result to JSON records (at most 'limit' rows).
+
+    Parameters:
+        df (pd.DataFrame): the result.
+        limit (int): the maximum number of rows returned (the count is always the full one).
+
+    Returns:
+        dict: the count and the rows of the result.
+    """
+    df_rows = df.head(limit)
+    return {"count": len(df), "returned": len(df_rows), "rows": json.loads(df_rows.to_json(orient="records", date_format="iso"))}
+
+def query_store(store: dict, path: str, dic_params: dict) -> dict:
+    """
+    Answers a query of the API.
+        /status: the event log loaded.
+        /events?cig=A,B: the events of the cases ('cig' is required).
+        /slice?<column>=v1,v2&amount_gt=..&amount_le=..: the events matching the filters (trace attributes, amount range).
+        /cases?<column>=..&min_duration=..&max_duration=..: the cases (one row per case, duration in months) matching the filters.
+        /aggregate?by=<column>,<column>&<column>=..: cases, events and duration (mean, median, 90th percentile) of the matching cases by group.
+
+    Parameters:
+        store (dict): the store (see log_store_load).
+        path (str): the endpoint.
+        dic_params (dict): the query parameters (lists of values).
+
+    Returns:
+        dict: the result (at most 'limit' rows, SERVICE_ROWS_LIMIT by default).
+    """
+    dic_filters = {key: values for key, values in dic_params.items() if key not in LIST_PARAMS}
+    limit = int(param_value(dic_params, "limit", service_rows_limit))
+    if limit < 0:
+        raise ValueError(f"The parameter 'limit' must not be negative ({limit})")
+    if path == "/status":
+        return {"path": str(store["path"]), "events": len(store["df"]), "cases": len(store["cases"]), "columns": list(store["df"].columns), "indexed": list(store["index"]["bitmaps"])}
+    if path == "/events":
+        if len(dic_params.get("cig", [])) == 0:
+            raise ValueError("The parameter 'cig' is missing")
+        return df_to_records(log_store_events(store, dic_params.get("cig", [])), limit)
+    if path == "/slice":
+        return df_to_records(log_store_slice(store, dic_filters, param_value(dic_params, "amount_gt"), param_value(dic_params, "amount_le")), limit)
+    if path == "/cases":
+        return df_to_records(log_store_cases(store, dic_filters, param_value(dic_params, "min_duration"), param_value(dic_params, "max_duration")).reset_index(), limit)
+    if path == "/aggregate":
+        if len(dic_params.get("by", [])) == 0:
+            raise ValueError("The parameter 'by' is missing")
+        return df_to_records(log_store_aggregate(store, dic_params["by"], dic_filters, param_value(dic_params, "min_duration"), param_value(dic_params, "max_duration")), limit)
+    raise KeyError(f"Unknown endpoint '{path}' (/status, /events, /slice, /cases, /aggregate)")
+
+### MAIN ###
+
+def main():
+    parser = argparse.ArgumentParser(description="Keeps an event log in memory and answers queries through a local HTTP API")
+    parser.add_argument("--log", default=file_event_log, help=f"the event log in EVENT_LOG_DIR (default {file_event_log})")
+    parser.add_argument("--host", default=service_host, help=f"the address of the service (default {service_host})")
+    parser.add_argument("--port", type=int, default=service_port, help=f"the port of the service (default {service_port})")
+    args = parser.parse_args()
+
+    print()
+    print(f"*** PROGRAM START ({script_name}) ***")
+    print()
+
+    service = LogService(log_dir, args.log, service_cache_size)
+    server = ThreadingHTTPServer((args.host, args.port), LogRequestHandler)
+    server.service = service
+    print(f"Serving on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    print()
+    print("*** PROGRAM END ***")
+    print()
+
+
+if __name__ == "__main__":
+    main()
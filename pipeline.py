@@ -0,0 +1,107 @@
+# pipeline.py
+# Runs the scripts 01_data_to_log.py, 02_log_filter_TED.py and 03_log_filter_threshold.py in one process, handing the event logs from stage to stage in memory
+
+### IMPORT ###
+from datetime import datetime
+import argparse
+import importlib
+
+### FUNCTIONS ###
+
+def import_script(script_module: str):
+    """
+    Imports a script of the pipeline (and its dependencies) only when one of its stages is run.
+
+    Parameters:
+        script_module (str): the module name of the script (e.g., '01_data_to_log').
+
+    Returns:
+        The module of the script.
+    """
+    return importlib.import_module(script_module)
+
+def run_all(checkpoint_do: bool, resume_do: bool, write_logs: bool) -> None:
+    """
+    Runs the three scripts in one process: the event log and the event log with the cases from TED are handed to the next stage in memory (and saved only if asked).
+
+    Parameters:
+        checkpoint_do (bool): True to save every stage of 01_data_to_log.py in the checkpoint directory.
+        resume_do (bool): True to resume 01_data_to_log.py from its last completed stage.
+        write_logs (bool): True to also save the intermediate event logs (the complete one and the one with the cases from TED) with their indexes.
+
+    Returns:
+        None
+    """
+    script_log = import_script("01_data_to_log")
+    df_log = script_log.build_event_log(checkpoint_do, resume_do)
+    if write_logs:
+        script_log.save_event_log(df_log)
+
+    script_ted = import_script("02_log_filter_TED")
+    from utility_manager.csv_writer import df_as_read_csv
+    from utility_manager.bitmap_index import bitmap_index_build
+    # The event log is handed over as 02_log_filter_TED.py would read it from its CSV file (same rows, order and values)
+    df_log = df_as_read_csv(df_log, script_log.csv_sep)
+    df_log_ted = script_ted.filter_log_ted(df_log)
+    del df_log
+    if write_logs:
+        index_log = script_ted.save_log_ted(df_log_ted)
+    else:
+        index_log = bitmap_index_build(df_log_ted, script_ted.list_index_cols, script_ted.index_amount_col, script_ted.list_index_amount_bounds)
+
+    script_threshold = import_script("03_log_filter_threshold")
+    script_threshold.save_log_threshold(df_log_ted, index_log)
+    script_threshold.save_case_statistics(df_log_ted)
+
+### MAIN ###
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the pipeline from the ANAC Open Data catalogue to the event logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_all = subparsers.add_parser("all", help="run the three scripts in one process, handing the event logs in memory")
+    parser_all.add_argument("--write-logs", action="store_true", help="also save the intermediate event logs (complete and TED)")
+    parser_log = subparsers.add_parser("log", help="run 01_data_to_log.py")
+    for subparser in [parser_all, parser_log]:
+        subparser.add_argument("--checkpoint", action="store_true", help="save every stage of 01_data_to_log.py in the checkpoint directory (CHECKPOINT_DIR)")
+        subparser.add_argument("--resume", action="store_true", help="resume 01_data_to_log.py from its last completed stage (implies --checkpoint)")
+    subparsers.add_parser("ted", help="run 02_log_filter_TED.py")
+    subparsers.add_parser("threshold", help="run 03_log_filter_threshold.py")
+    args = parser.parse_args()
+
+    # Single scripts (only the modules of the script are imported)
+    if args.command == "log":
+        import_script("01_data_to_log").main(args.checkpoint, args.resume)
+        return
+    if args.command == "ted":
+        import_script("02_log_filter_TED").main()
+        return
+    if args.command == "threshold":
+        import_script("03_log_filter_threshold").main()
+        return
+
+    print()
+    print("*** PROGRAM START (pipeline.py) ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    print()
+
+    run_all(args.checkpoint, args.resume, args.write_logs)
+
+    # Program end
+    end_time = datetime.now().replace(microsecond=0)
+    delta_time = end_time - start_time
+    
+    print()
+    print("End process:", end_time)
+    print("Time to finish:", delta_time)
+    print()
+
+    print()
+    print("*** PROGRAM END ***")
+    print()
+
+
+if __name__ == "__main__":
+    main()
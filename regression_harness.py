@@ -0,0 +1,456 @@
+# regression_harness.py
+# Runs a reference build and a candidate build of the scripts on the same synthetic catalogue, compares their outputs and checks the candidate's wall time and peak memory against a stored baseline
+
+### IMPORT ###
+import pandas as pd
+import numpy as np
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import resource # POSIX only (Linux, macOS): the peak memory of the scripts
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+import yaml
+
+### LOCAL IMPORT ###
+from config import config_reader
+from utility_manager.utilities import script_info
+from utility_manager.csv_writer import CSV_COMPRESSION_SUFFIX
+
+### GLOBALS ###
+yaml_config = config_reader.config_read_yaml("config.yml", "config")
+# print(yaml_config) # debug
+csv_sep = str(yaml_config["CSV_FILE_SEP"])
+
+harness_dir = str(yaml_config["HARNESS_DIR"])
+harness_cases = int(yaml_config["HARNESS_CASES"])
+harness_seed = int(yaml_config["HARNESS_SEED"])
+harness_time_tolerance = float(yaml_config["HARNESS_TIME_TOLERANCE"])
+harness_memory_tolerance = float(yaml_config["HARNESS_MEMORY_TOLERANCE"])
+harness_float_tolerance = float(yaml_config["HARNESS_FLOAT_TOLERANCE"])
+
+list_scripts = ["01_data_to_log.py", "02_log_filter_TED.py", "03_log_filter_threshold.py"] # scripts of a build, in order
+file_baseline = "baseline.json" # OUTPUT: wall time and peak memory of the scripts (in harness_dir)
+file_cig_ted = "ANAC_TED_CIG_found.csv" # INPUT of 02_log_filter_TED.py (part of the catalogue)
+diff_max = 5 # differences printed for every file
+
+script_path, script_name = script_info(__file__)
+
+### FUNCTIONS ###
+
+def make_catalogue(catalogue_dir: Path, cases_num: int, seed: int) -> str:
+    """
+    Writes a small synthetic Open Data catalogue (the main tender file, the files of the other events, the lookup datasets) and the list of CIG in TED texts.
+    The catalogue only depends on the number of cases and on the seed.
+
+    Parameters:
+        catalogue_dir (Path): the directory of the catalogue ('open_data_anac' and 'event_log' are created inside).
+        cases_num (int): the number of tenders.
+        seed (int): the seed of the random values.
+
+    Returns:
+        str: the fingerprint of the catalogue (hash of its files).
+    """
+    rng = random.Random(seed)
+    if catalogue_dir.exists():
+        shutil.rmtree(catalogue_dir)
+    od_dir = catalogue_dir / "open_data_anac"
+    ted_dir = catalogue_dir / "event_log"
+    od_dir.mkdir(parents=True)
+    ted_dir.mkdir(parents=True)
+    list_regions = ["SEZIONE REGIONALE LOMBARDIA", "SEZIONE REGIONALE  LAZIO", "SEZIONE REGIONALE PROVINCIA AUTONOMA DI TRENTO", "CENTRALE", "NON CLASSIFICATO", "SEZIONE REGIONALE VENETO"]
+    list_types = ["FORNITURE", "SERVIZI", "LAVORI"]
+
+    def write_csv(file_name, list_header, list_rows):
+        with open(od_dir / file_name, "w", newline="") as fp:
+            writer = csv.writer(fp, delimiter=";")
+            writer.writerow(list_header)
+            writer.writerows(list_rows)
+
+    # Main tender file (also tenders filtered out and unclassified regions)
+    list_cig = [f"{case_pos:010X}" for case_pos in range(cases_num)]
+    list_rows = []
+    for cig in list_cig:
+        year = rng.choice([2015, 2016, 2018, 2020, 2022])
+        date_pub = date(year, rng.randint(1, 12), rng.randint(1, 28))
+        list_rows.append([cig, "" if rng.random() > 0.1 else "X", f"{rng.randint(10, 99)}000000-1", rng.choice(list_types), rng.choice(["SETTORI ORDINARI", "SETTORI SPECIALI"]), rng.choice(list_regions), round(rng.uniform(1e4, 9e6), 2), rng.choice(["1", "4", "8", "24", "99"]), rng.choice(["1", "11", "7", "2"]), str(year), date_pub.isoformat() if rng.random() > 0.05 else "", "ATTIVO", f"{rng.randint(0, 30):011d}"])
+    write_csv("TENDER_NOTICE.csv", ["cig", "cig_accordo_quadro", "cod_cpv", "oggetto_principale_contratto", "settore", "sezione_regionale", "importo_lotto", "cod_tipo_scelta_contraente", "cod_modalita_realizzazione", "anno_pubblicazione", "data_pubblicazione", "stato", "cf_amministrazione_appaltante"], list_rows)
+
+    # Files of the other events (also CIG not in the main tender file)
+    dic_events = {"AWARDS.csv": "data_aggiudicazione_definitiva", "CONTRACT_START.csv": "data_stipula_contratto", "CONTRACT_END.csv": "data_effettiva_ultimazione", "PROGRESS_STATES.csv": "data_emissione_sal", "PUBLICATIONS-IT.csv": "data_guri", "SUSPENSIONS.csv": "data_sospensione", "VARIANTS.csv": "data_approvazione_variante"}
+    for file_name, col_date in dic_events.items():
+        list_rows = []
+        for cig in list_cig + [f"ZZZ{case_pos:07d}" for case_pos in range(20)]:
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                list_rows.append([cig, (date(2016, 1, 1) + timedelta(days=rng.randint(0, 3000))).isoformat(), rng.choice(["a", "b"])])
+        write_csv(file_name, ["cig", col_date, "note"], list_rows)
+
+    # Lookup datasets
+    write_csv("CONTRACTING_AUTHORITIES.csv", ["codice_fiscale", "denominazione", "natura_giuridica_codice", "natura_giuridica_descrizione"], [[f"{auth_pos:011d}", f"ENTE {auth_pos}", f"{auth_pos % 5:02d}", f"NATURA {auth_pos % 5}"] for auth_pos in range(25)])
+    write_csv("ECONOMIC_OPERATOR.csv", ["cig", "codice_fiscale", "denominazione", "ruolo", "tipo_soggetto"], [[cig, f"{rng.randint(0, 99999):011d}", "IMPRESA", rng.choice(["MANDATARIA", "MANDANTE", ""]), rng.choice(["IMPRESA SINGOLA", "RTI"])] for cig in list_cig for _ in range(rng.choice([0, 1, 2]))])
+    write_csv("WORK_CATEGORY.csv", ["cig", "id_categoria", "descrizione", "cod_tipo_categoria", "descrizione_tipo_categoria"], [[cig, rng.choice(["OG1", "OG3", "OS30", "FB"]), "CATEGORIA", cat_type, "PREVALENTE" if cat_type == "P" else "SCORPORABILE"] for cig in list_cig for cat_type in ["P", "S"][:rng.choice([0, 1, 2])]])
+
+    # CIG in TED texts
+    with open(ted_dir / file_cig_ted, "w") as fp:
+        fp.write("cig_ted\n")
+        fp.writelines(f"{cig}\n" for cig in list_cig[::2])
+
+    hash_files = hashlib.sha1()
+    for path_file in sorted(catalogue_dir.rglob("*.csv")):
+        hash_files.update(str(path_file.relative_to(catalogue_dir)).encode("utf-8"))
+        hash_files.update(path_file.read_bytes())
+    return hash_files.hexdigest()
+
+def prepare_build(source: str, build_dir: Path) -> Path:
+    """
+    Returns the directory with the scripts of a build: a directory, or a git revision of this repository exported in 'build_dir'.
+
+    Parameters:
+        source (str): a directory with the scripts or a git revision (e.g., 'HEAD', a branch, a commit).
+        build_dir (Path): the directory where a git revision is exported.
+
+    Returns:
+        Path: the directory with the scripts.
+    """
+    if Path(source).is_dir():
+        return Path(source).resolve()
+    if build_dir.exists():
+        shutil.rmtree(build_dir)
+    build_dir.mkdir(parents=True)
+    result = subprocess.run(["git", "-C", str(script_path.parent), "archive", "--format=tar", source], capture_output=True, check=True)
+    with tarfile.open(fileobj=io.BytesIO(result.stdout)) as tar_file:
+        tar_file.extractall(build_dir, filter="data")
+    return build_dir.resolve()
+
+def prepare_run(src_dir: Path, run_dir: Path, catalogue_dir: Path, dic_config_set: dict) -> dict:
+    """
+    Prepares the working directory of a run: the configuration of the build (with the values to be changed), its configuration files and the catalogue.
+
+    Parameters:
+        src_dir (Path): the directory with the scripts of the build.
+        run_dir (Path): the working directory of the run (emptied).
+        catalogue_dir (Path): the directory of the catalogue (see make_catalogue).
+        dic_config_set (dict): the values of config.yml to be changed.
+
+    Returns:
+        dict: the configuration of the run.
+    """
+    if run_dir.exists():
+        shutil.rmtree(run_dir)
+    (run_dir / "config").mkdir(parents=True)
+    with open(src_dir / "config" / "config.yml") as fp:
+        run_config = yaml.safe_load(fp)
+    run_config.update(dic_config_set)
+    with open(run_dir / "config" / "config.yml", "w") as fp:
+        yaml.safe_dump(run_config, fp, sort_keys=False, allow_unicode=True)
+    for path_conf in src_dir.glob("*.json"):
+        shutil.copy(path_conf, run_dir / path_conf.name)
+    shutil.copytree(catalogue_dir / "open_data_anac", run_dir / str(run_config["OD_ANAC_DIR"]))
+    (run_dir / str(run_config["EVENT_LOG_DIR"])).mkdir(parents=True, exist_ok=True)
+    shutil.copy(catalogue_dir / "event_log" / file_cig_ted, run_dir / str(run_config["EVENT_LOG_DIR"]) / file_cig_ted)
+    return run_config
+
+def run_script(src_dir: Path, run_dir: Path, script_file: str) -> dict:
+    """
+    Runs a script of a build in its own process and measures it.
+
+    Parameters:
+        src_dir (Path): the directory with the scripts of the build.
+        run_dir (Path): the working directory of the run.
+        script_file (str): the script.
+
+    Returns:
+        dict: the exit code, the wall time (seconds) and the peak memory (resident set size, MB) of the script.
+    """
+    with open(run_dir / f"{Path(script_file).stem}.txt", "w") as fp_out:
+        start_time = time.perf_counter()
+        process = subprocess.Popen([sys.executable, str(src_dir / script_file)], cwd=run_dir, stdout=fp_out, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            # wait4 returns the resources used by this process only (ru_maxrss in KB on Linux, in bytes on macOS)
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        else:
+            # Without wait4 (POSIX systems lacking it), the peak is the largest one of the children run so far (an upper bound)
+            process.wait()
+            rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall_time = time.perf_counter() - start_time
+    peak_bytes = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    return {"returncode": process.returncode, "wall_s": round(wall_time, 3), "peak_mb": round(peak_bytes / 1024**2, 1)}
+
+def run_build(src_dir: Path, run_dir: Path, catalogue_dir: Path, dic_config_set: dict, repeat: int) -> tuple:
+    """
+    Runs the scripts of a build on the catalogue ('repeat' times, the outputs of the last run are kept).
+
+    Parameters:
+        src_dir (Path): the directory with the scripts of the build.
+        run_dir (Path): the working directory of the run.
+        catalogue_dir (Path): the directory of the catalogue.
+        dic_config_set (dict): the values of config.yml to be changed.
+        repeat (int): the number of runs (the lowest wall time and peak memory are kept).
+
+    Returns:
+        tuple: the configuration of the run and the measures of every script (None if a script failed).
+    """
+    dic_measures = {}
+    for run_pos in range(repeat):
+        run_config = prepare_run(src_dir, run_dir, catalogue_dir, dic_config_set)
+        for script_file in list_scripts:
+            dic_run = run_script(src_dir, run_dir, script_file)
+            print(f"{script_file} (run {run_pos + 1}/{repeat}): exit code {dic_run['returncode']}, {dic_run['wall_s']} s, {dic_run['peak_mb']} MB")
+            if dic_run["returncode"] != 0:
+                print(f"Error: {script_file} failed, see {run_dir / (Path(script_file).stem + '.txt')}")
+                return run_config, None
+            dic_best = dic_measures.setdefault(script_file, {"wall_s": dic_run["wall_s"], "peak_mb": dic_run["peak_mb"]})
+            dic_best["wall_s"] = min(dic_best["wall_s"], dic_run["wall_s"])
+            dic_best["peak_mb"] = min(dic_best["peak_mb"], dic_run["peak_mb"])
+    dic_measures["total"] = {"wall_s": round(sum(dic_measures[script_file]["wall_s"] for script_file in list_scripts), 3), "peak_mb": max(dic_measures[script_file]["peak_mb"] for script_file in list_scripts)}
+    return run_config, dic_measures
+
+def list_output_files(run_dir: Path, run_config: dict) -> list:
+    """
+    Returns the CSV outputs of a run (event logs and stats, also compressed), as paths relative to the run directory.
+
+    Parameters:
+        run_dir (Path): the working directory of the run.
+        run_config (dict): the configuration of the run.
+
+    Returns:
+        list: the relative paths of the outputs.
+    """
+    list_files = []
+    for dir_name in [str(run_config["EVENT_LOG_DIR"]), str(run_config["OD_STATS_DIR"])]:
+        for path_file in sorted((run_dir / dir_name).glob("*.csv*")) if (run_dir / dir_name).is_dir() else []:
+            if path_file.name != file_cig_ted:
+                list_files.append(path_file.relative_to(run_dir))
+    return list_files
+
+def output_key(path_file: Path) -> Path:
+    """
+    Returns the name of an output without its compression suffix (to pair the outputs of runs with another CSV_WRITE_COMPRESSION).
+
+    Parameters:
+        path_file (Path): the relative path of the output.
+
+    Returns:
+        Path: the relative path without the compression suffix.
+    """
+    if path_file.suffix in CSV_COMPRESSION_SUFFIX.values():
+        return path_file.with_suffix("")
+    return path_file
+
+def float_column(values_ref: pd.Series) -> bool:
+    """
+    Checks whether a column of the reference holds floats: all its values are numbers or empty, and some have a decimal point or an exponent (codes and counts are integers, compared exactly).
+
+    Parameters:
+        values_ref (pd.Series): the texts of the column in the reference file.
+
+    Returns:
+        bool: True if the column holds floats.
+    """
+    values = values_ref[values_ref != ""]
+    if len(values) == 0 or pd.to_numeric(values, errors="coerce").isna().any():
+        return False
+    return bool(values.str.contains(r"[.eE]").any())
+
+def compare_csv(path_ref: Path, path_cand: Path, float_tolerance: float) -> list:
+    """
+    Compares two CSV files semantically: same columns, same rows in the same order, same values.
+    The values of the float columns (of the reference) are equal within a relative tolerance when both texts are numbers (so that '1.0' and '1' are equal); the other columns are compared exactly (e.g., '01' and '1' are different codes).
+    The files may be compressed (by their suffix).
+
+    Parameters:
+        path_ref (Path): the file of the reference build.
+        path_cand (Path): the file of the candidate build.
+        float_tolerance (float): the relative tolerance of the numbers.
+
+    Returns:
+        list: the differences found (empty if the files are equivalent).
+    """
+    df_ref = pd.read_csv(path_ref, sep=csv_sep, dtype=str, keep_default_na=False, compression="infer")
+    df_cand = pd.read_csv(path_cand, sep=csv_sep, dtype=str, keep_default_na=False, compression="infer")
+    if list(df_ref.columns) != list(df_cand.columns):
+        list_only_ref = [col for col in df_ref.columns if col not in df_cand.columns]
+        list_only_cand = [col for col in df_cand.columns if col not in df_ref.columns]
+        if len(list_only_ref) + len(list_only_cand) == 0:
+            return [f"columns in another order: {list(df_cand.columns)}"]
+        return [f"columns only in reference: {list_only_ref}, only in candidate: {list_only_cand}"]
+    list_diffs = []
+    if len(df_ref) != len(df_cand):
+        list_diffs.append(f"rows: {len(df_ref)} != {len(df_cand)}")
+        if "case_id" in df_ref.columns:
+            set_ref, set_cand = set(df_ref["case_id"]), set(df_cand["case_id"])
+            list_diffs.append(f"cases: {len(set_ref)} != {len(set_cand)} ({len(set_ref - set_cand)} only in reference, {len(set_cand - set_ref)} only in candidate)")
+        return list_diffs
+    for col in df_ref.columns:
+        values_ref, values_cand = df_ref[col], df_cand[col]
+        mask_diff = (values_ref != values_cand).to_numpy()
+        if not mask_diff.any():
+            continue
+        # In a float column, different texts of the same number are equal (an empty value is never equal to a number)
+        mask_number = np.zeros(mask_diff.sum(), dtype=bool)
+        if float_column(values_ref):
+            numbers_ref = pd.to_numeric(values_ref[mask_diff], errors="coerce").to_numpy(dtype=float)
+            numbers_cand = pd.to_numeric(values_cand[mask_diff], errors="coerce").to_numpy(dtype=float)
+            mask_number = np.isclose(numbers_ref, numbers_cand, rtol=float_tolerance, atol=0)
+        for row_pos in np.flatnonzero(mask_diff)[~mask_number]:
+            list_diffs.append(f"row {row_pos + 1}, column '{col}': '{values_ref.iloc[row_pos]}' != '{values_cand.iloc[row_pos]}'")
+    return list_diffs
+
+def compare_outputs(run_dir_ref: Path, config_ref: dict, run_dir_cand: Path, config_cand: dict, float_tolerance: float) -> bool:
+    """
+    Compares all the outputs of the reference and candidate runs (the event logs, their threshold partitions and the stats), paired by their name without the compression suffix.
+
+    Parameters:
+        run_dir_ref (Path): the working directory of the reference run.
+        config_ref (dict): the configuration of the reference run.
+        run_dir_cand (Path): the working directory of the candidate run.
+        config_cand (dict): the configuration of the candidate run.
+        float_tolerance (float): the relative tolerance of the numbers.
+
+    Returns:
+        bool: True if the outputs are equivalent.
+    """
+    dic_ref = {output_key(path_file): path_file for path_file in list_output_files(run_dir_ref, config_ref)}
+    dic_cand = {output_key(path_file): path_file for path_file in list_output_files(run_dir_cand, config_cand)}
+    same_outputs = True
+    for key_file, path_file in dic_ref.items():
+        if key_file not in dic_cand:
+            print(f"FAIL {path_file}: missing in the candidate")
+            same_outputs = False
+            continue
+        list_diffs = compare_csv(run_dir_ref / path_file, run_dir_cand / dic_cand[key_file], float_tolerance)
+        if len(list_diffs) > 0:
+            same_outputs = False
+            print(f"FAIL {path_file}: {len(list_diffs)} differences")
+            for diff_text in list_diffs[:diff_max]:
+                print(f"    {diff_text}")
+        else:
+            print(f"OK   {path_file}")
+    for key_file, path_file in dic_cand.items():
+        if key_file not in dic_ref:
+            print(f"NEW  {path_file}: only in the candidate (not compared)")
+    return same_outputs
+
+def check_performance(dic_measures: dict, dic_baseline: dict, time_tolerance: float, memory_tolerance: float) -> bool:
+    """
+    Checks the measures of the candidate against the baseline: the wall time and the peak memory of every script (and in total) must not exceed the baseline by more than the tolerances.
+
+    Parameters:
+        dic_measures (dict): the measures of the candidate (see run_build).
+        dic_baseline (dict): the stored baseline.
+        time_tolerance (float): the allowed wall time regression (share of the baseline).
+        memory_tolerance (float): the allowed peak memory regression (share of the baseline).
+
+    Returns:
+        bool: True if there is no regression.
+    """
+    no_regression = True
+    for script_file, dic_script in dic_measures.items():
+        dic_base = dic_baseline["measures"].get(script_file)
+        if dic_base is None:
+            continue
+        for measure, tolerance in [("wall_s", time_tolerance), ("peak_mb", memory_tolerance)]:
+            value_limit = dic_base[measure] * (1 + tolerance)
+            ratio = dic_script[measure] / dic_base[measure] if dic_base[measure] > 0 else 1
+            status = "OK  " if dic_script[measure] <= value_limit else "FAIL"
+            no_regression = no_regression and status == "OK  "
+            print(f"{status} {script_file} {measure}: {dic_script[measure]} (baseline {dic_base[measure]}, x{ratio:.2f}, limit {value_limit:.1f})")
+    return no_regression
+
+### MAIN ###
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a reference and a candidate build on a synthetic catalogue, compares their outputs and checks the candidate's performance against a baseline")
+    parser.add_argument("--reference", default="HEAD", help="the reference build: a git revision of this repository or a directory (default HEAD)")
+    parser.add_argument("--candidate", default=str(script_path.parent), help="the candidate build: a directory or a git revision (default this working tree)")
+    parser.add_argument("--set", dest="config_set", action="append", default=[], metavar="KEY=VALUE", help="a value of config.yml changed for the candidate (e.g., EXECUTION_BACKEND=arrow), repeatable")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of every build (the lowest wall time and peak memory are kept)")
+    parser.add_argument("--update-baseline", action="store_true", help="store the measures of the candidate as the new baseline (only if the outputs match)")
+    args = parser.parse_args()
+    dic_config_set = {key: yaml.safe_load(value) for key, value in (item.split("=", 1) for item in args.config_set)}
+
+    print()
+    print(f"*** PROGRAM START ({script_name}) ***")
+    print()
+
+    start_time = datetime.now().replace(microsecond=0)
+    print("Start process: " + str(start_time))
+    print()
+
+    work_dir = Path(harness_dir)
+    path_baseline = work_dir / file_baseline
+
+    print(">> Creating the catalogue")
+    catalogue_dir = work_dir / f"catalogue_{harness_cases}_{harness_seed}"
+    catalogue_fingerprint = make_catalogue(catalogue_dir, harness_cases, harness_seed)
+    print(f"Catalogue: {catalogue_dir} ({harness_cases} tenders, seed {harness_seed}, fingerprint {catalogue_fingerprint[:12]})")
+    print()
+
+    print(">> Running the reference build:", args.reference)
+    src_ref = prepare_build(args.reference, work_dir / "build_reference")
+    config_ref, measures_ref = run_build(src_ref, work_dir / "run_reference", catalogue_dir, {}, args.repeat)
+    print()
+
+    print(">> Running the candidate build:", args.candidate, dic_config_set if len(dic_config_set) > 0 else "")
+    src_cand = prepare_build(args.candidate, work_dir / "build_candidate")
+    config_cand, measures_cand = run_build(src_cand, work_dir / "run_candidate", catalogue_dir, dic_config_set, args.repeat)
+    print()
+
+    result_ok = measures_ref is not None and measures_cand is not None
+    if result_ok:
+        print(">> Comparing the outputs")
+        result_ok = compare_outputs(work_dir / "run_reference", config_ref, work_dir / "run_candidate", config_cand, harness_float_tolerance)
+        print()
+
+        print(">> Checking the performance")
+        print(f"Total: reference {measures_ref['total']['wall_s']} s, {measures_ref['total']['peak_mb']} MB; candidate {measures_cand['total']['wall_s']} s, {measures_cand['total']['peak_mb']} MB")
+        if args.update_baseline and not result_ok:
+            print("Baseline not saved: the outputs of the candidate differ from the reference")
+        elif args.update_baseline:
+            work_dir.mkdir(parents=True, exist_ok=True)
+            dic_baseline = {"catalogue": {"cases": harness_cases, "seed": harness_seed, "fingerprint": catalogue_fingerprint}, "candidate": args.candidate, "config_set": dic_config_set, "created": str(start_time), "measures": measures_cand}
+            with open(path_baseline, "w") as fp:
+                json.dump(dic_baseline, fp, indent=4)
+            print("Baseline saved to:", path_baseline)
+        elif not path_baseline.exists():
+            print(f"Warning: no baseline in '{path_baseline}', performance not checked (run with --update-baseline)")
+        else:
+            with open(path_baseline) as fp:
+                dic_baseline = json.load(fp)
+            if dic_baseline["catalogue"]["fingerprint"] != catalogue_fingerprint:
+                print(f"Warning: the baseline in '{path_baseline}' was measured on another catalogue, performance not checked (run with --update-baseline)")
+            else:
+                result_ok = check_performance(measures_cand, dic_baseline, harness_time_tolerance, harness_memory_tolerance) and result_ok
+        print()
+
+    print("RESULT:", "PASS" if result_ok else "FAIL")
+
+    # Program end
+    end_time = datetime.now().replace(microsecond=0)
+    delta_time = end_time - start_time
+
+    print()
+    print("End process:", end_time)
+    print("Time to finish:", delta_time)
+    print()
+
+    print()
+    print("*** PROGRAM END ***")
+    print()
+
+    if not result_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
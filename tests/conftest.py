@@ -0,0 +1,46 @@
+# conftest.py
+# Shared fixtures of the tests: the modules of the repository are imported from its root
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+if str(REPO_DIR) not in sys.path:
+    sys.path.insert(0, str(REPO_DIR))
+
+@pytest.fixture
+def od_dir(tmp_path: Path) -> Path:
+    """
+    An empty Open Data directory.
+    """
+    dir_od = tmp_path / "open_data_anac"
+    dir_od.mkdir()
+    return dir_od
+
+def load_script(module_name: str, file_name: str):
+    """
+    Imports a script of the repository (its globals are read from config/config.yml, relative to the working directory).
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(REPO_DIR)
+        spec = importlib.util.spec_from_file_location(module_name, REPO_DIR / file_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope="module")
+def script_01():
+    """
+    The module of 01_data_to_log.py.
+    """
+    return load_script("data_to_log", "01_data_to_log.py")
+
+@pytest.fixture(scope="module")
+def log_service():
+    """
+    The module of log_service.py.
+    """
+    return load_script("log_service", "log_service.py")
@@ -0,0 +1,51 @@
+# test_backends.py
+# The 'arrow' backend gives the results of the 'pandas' one
+
+import pandas as pd
+import pytest
+
+from utility_manager.backends import execution_backend
+
+pytest.importorskip("pyarrow")
+
+CSV_TEXT = 'cig;importo;oggetto;data\nA;1.5;"lavori\nstradali";2020-01-02\nB;2;servizi;\nA;1.5;"lavori\nstradali";2020-01-02\nC;;forniture;2021-03-04\n'
+
+@pytest.fixture
+def backends():
+    return execution_backend("pandas"), execution_backend("arrow")
+
+def test_read_csv_with_newlines_in_values(od_dir, backends):
+    (od_dir / "TENDER.csv").write_text(CSV_TEXT)
+    df_pandas, df_arrow = [backend.read_csv(str(od_dir), "TENDER.csv", ["data"], {"cig": object, "oggetto": "object"}) for backend in backends]
+    pd.testing.assert_frame_equal(df_arrow, df_pandas)
+    assert df_arrow["oggetto"].tolist() == ["lavori\nstradali", "servizi", "forniture"]
+
+def test_read_csv_with_keys(od_dir, backends):
+    (od_dir / "TENDER.csv").write_text(CSV_TEXT)
+    df_pandas, df_arrow = [backend.read_csv(str(od_dir), "TENDER.csv", [], {"cig": object}, list_keys=["B", "C"]) for backend in backends]
+    pd.testing.assert_frame_equal(df_arrow, df_pandas)
+
+def test_read_csv_refuses_unsupported_types(od_dir, backends):
+    (od_dir / "TENDER.csv").write_text(CSV_TEXT)
+    with pytest.raises(ValueError, match="category"):
+        backends[1].read_csv(str(od_dir), "TENDER.csv", [], {"cig": "category"})
+
+@pytest.mark.parametrize("list_values, date_format", [
+    (["2020-01-02 10:11:12", None, "2021-12-31 00:00:00"], "%Y-%m-%d %H:%M:%S"),
+    (["02/01/2020 10:11", "31/12/2021 00:00"], "%d/%m/%Y %H:%M"),
+    (["2020-01-02 10:11:12.250", "2021-12-31 00:00:00.000"], "%Y-%m-%d %H:%M:%S.%f"),
+    (["2020-01-02", "2021-12-31 10:00:00"], "mixed"),
+    (["2020-01-02 10:11:12", "2021-12-31 00:00:00"], None),
+])
+def test_to_datetime_follows_the_format(backends, list_values, date_format):
+    backend_pandas, backend_arrow = backends
+    df = pd.DataFrame({"event_timestamp": pd.Series(list_values, dtype=object)})
+    series_pandas = backend_pandas.to_datetime(df.copy(), "event_timestamp", date_format)["event_timestamp"]
+    series_arrow = backend_arrow.to_pandas(backend_arrow.to_datetime(backend_arrow.from_pandas(df), "event_timestamp", date_format))["event_timestamp"]
+    pd.testing.assert_series_equal(series_arrow, series_pandas)
+
+def test_to_datetime_refuses_other_formats(backends):
+    backend_arrow = backends[1]
+    frame = backend_arrow.from_pandas(pd.DataFrame({"event_timestamp": ["02/01/2020 10:11"]}))
+    with pytest.raises(ValueError):
+        backend_arrow.to_datetime(frame, "event_timestamp", "%Y-%m-%d %H:%M")
@@ -0,0 +1,49 @@
+# test_bitmap_index.py
+# Bitmap index of an event log: saved next to the CSV file, not used when the file has changed
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from utility_manager.bitmap_index import bitmap_index_path, bitmap_index_build, bitmap_index_save, bitmap_index_load
+
+def log_saved(tmp_path):
+    """
+    An event log written to CSV with its saved index.
+    """
+    df = pd.DataFrame({"case_id": ["A", "A", "B", "C"], "sezione_regionale": ["LAZIO", "LAZIO", None, "LOMBARDIA"], "importo_lotto": [100.0, 100.0, 5000.0, None]})
+    path_data = tmp_path / "log.csv"
+    df.to_csv(path_data, sep=";", index=False)
+    index = bitmap_index_build(df, ["sezione_regionale"], "importo_lotto", [1000])
+    bitmap_index_save(index, bitmap_index_path(path_data), path_data)
+    return path_data, index
+
+def test_index_round_trip(tmp_path):
+    path_data, index = log_saved(tmp_path)
+    assert bitmap_index_path(path_data) == tmp_path / "log_index.npz"
+    index_loaded = bitmap_index_load(bitmap_index_path(path_data), path_data)
+    assert index_loaded["rows"] == 4
+    assert index_loaded["amount_bounds"] == [1000.0]
+    for col, dic_bitmaps in index["bitmaps"].items():
+        for value, bitmap in dic_bitmaps.items():
+            np.testing.assert_array_equal(index_loaded["bitmaps"][col][value], bitmap)
+    assert np.unpackbits(index_loaded["bitmaps"]["sezione_regionale"]["LAZIO"])[:4].tolist() == [1, 1, 0, 0]
+    assert np.unpackbits(index_loaded["bitmaps"]["importo_lotto#bucket"]["1"])[:4].tolist() == [0, 0, 1, 0]
+
+def test_stale_index_is_not_used(tmp_path):
+    path_data, _ = log_saved(tmp_path)
+    file_stat = path_data.stat()
+    os.utime(path_data, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1_000_000_000))
+    assert bitmap_index_load(bitmap_index_path(path_data), path_data) is None
+    # Without the data file the saved index is returned as it is
+    assert bitmap_index_load(bitmap_index_path(path_data))["rows"] == 4
+
+def test_rewritten_data_makes_the_index_stale(tmp_path):
+    path_data, _ = log_saved(tmp_path)
+    with open(path_data, "a") as file:
+        file.write("D;LAZIO;1\n")
+    assert bitmap_index_load(bitmap_index_path(path_data), path_data) is None
+
+def test_missing_index(tmp_path):
+    assert bitmap_index_load(tmp_path / "log_index.npz") is None
@@ -0,0 +1,42 @@
+# test_checkpoint.py
+# Tests of utility_manager/checkpoint.py: a run is resumed only if its inputs and settings are unchanged
+
+import os
+
+import pandas as pd
+
+from utility_manager.checkpoint import checkpoint_fingerprint, checkpoint_open, checkpoint_save, checkpoint_load
+
+def run_saved(tmp_path, fingerprint: str) -> str:
+    """
+    A run directory with one completed stage.
+    """
+    run_dir = str(tmp_path / "run")
+    checkpoint_open(run_dir, fingerprint, False)
+    checkpoint_save(run_dir, "log", pd.DataFrame({"case_id": ["A", "B"]}))
+    return run_dir
+
+def test_resume_keeps_the_stages_of_the_same_inputs(tmp_path):
+    path_data = tmp_path / "data.csv"
+    path_data.write_text("cig;importo\nA;1\n")
+    dic_settings = {"CSV_FILE_SEP": ";", "SAMPLE_FRACTION": 0}
+    run_dir = run_saved(tmp_path, checkpoint_fingerprint([path_data], dic_settings))
+    assert checkpoint_open(run_dir, checkpoint_fingerprint([path_data], dic_settings), True) == ["log"]
+    assert checkpoint_load(run_dir, "log")["case_id"].tolist() == ["A", "B"]
+
+def test_changed_settings_discard_the_stages(tmp_path):
+    path_data = tmp_path / "data.csv"
+    path_data.write_text("cig;importo\nA;1\n")
+    run_dir = run_saved(tmp_path, checkpoint_fingerprint([path_data], {"CSV_FILE_SEP": ";"}))
+    assert checkpoint_open(run_dir, checkpoint_fingerprint([path_data], {"CSV_FILE_SEP": ","}), True) == []
+    assert not list((tmp_path / "run").glob("*.pkl"))
+
+def test_changed_input_discards_the_stages(tmp_path):
+    path_data = tmp_path / "data.csv"
+    path_data.write_text("cig;importo\nA;1\n")
+    fingerprint = checkpoint_fingerprint([path_data])
+    run_dir = run_saved(tmp_path, fingerprint)
+    file_stat = path_data.stat()
+    os.utime(path_data, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 1_000_000_000))
+    assert checkpoint_fingerprint([path_data]) != fingerprint
+    assert checkpoint_open(run_dir, checkpoint_fingerprint([path_data]), True) == []
@@ -0,0 +1,40 @@
+# test_csv_writer.py
+# Writing the event logs: output of a single to_csv call, copies in the other formats removed
+
+import gzip
+
+import pandas as pd
+import pytest
+
+from utility_manager.bitmap_index import bitmap_index_path
+from utility_manager.csv_writer import df_write_csv
+
+def log_frame() -> pd.DataFrame:
+    """
+    A small event log with a datetime column.
+    """
+    return pd.DataFrame({"case_id": ["A", "A", "B"], "timestamp": pd.to_datetime(["2020-01-01 10:00", "2020-01-02 00:00", "2020-02-01 08:30"]), "importo": [1.5, None, 3.0]})
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_write_matches_to_csv(tmp_path, workers):
+    df = log_frame()
+    path_out = df_write_csv(df, tmp_path / "log.csv", workers=workers, chunk_rows=1, executor="thread")
+    assert path_out.read_text() == df.to_csv(None, sep=";", index=False)
+
+def test_compressed_write_removes_the_plain_copy(tmp_path):
+    df = log_frame()
+    path_plain = df_write_csv(df, tmp_path / "log.csv")
+    bitmap_index_path(path_plain).write_bytes(b"stale")
+    path_out = df_write_csv(df, tmp_path / "log.csv", compression="gzip")
+    assert path_out == tmp_path / "log.csv.gz"
+    assert not path_plain.exists()
+    assert not bitmap_index_path(path_plain).exists()
+    assert gzip.decompress(path_out.read_bytes()).decode("utf-8") == df.to_csv(None, sep=";", index=False)
+
+def test_plain_write_removes_the_compressed_copy(tmp_path):
+    df = log_frame()
+    path_gz = df_write_csv(df, tmp_path / "log.csv", compression="gzip")
+    path_out = df_write_csv(df, tmp_path / "log.csv")
+    assert path_out.exists()
+    assert not path_gz.exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["log.csv"]
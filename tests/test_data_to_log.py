@@ -0,0 +1,35 @@
+# test_data_to_log.py
+# Merging the event logs of the files in partitions of cases (01_data_to_log.py)
+
+import pandas as pd
+
+LIST_FILL = ["oggetto_principale_contratto", "importo_lotto", "accordo_quadro", "cpv_division", "sezione_regionale", "cod_tipo_scelta_contraente", "cod_modalita_realizzazione"]
+
+def tender_log(list_cases: list) -> pd.DataFrame:
+    """
+    The event log of the main tender file: a TENDER_NOTICE event with the trace attributes for every case.
+    """
+    df = pd.DataFrame({"case_id": list_cases, "event_name": "TENDER_NOTICE", "event_timestamp": "2020-01-01 10:00:00"})
+    for col in LIST_FILL:
+        df[col] = [f"{col}_{case}" for case in list_cases]
+    return df
+
+def award_log(list_cases: list) -> pd.DataFrame:
+    """
+    The event log of another file: an AWARD event (without the trace attributes) for every case.
+    """
+    return pd.DataFrame({"case_id": list_cases, "event_name": "AWARD", "event_timestamp": "2020-03-01 10:00:00", "importo_aggiudicazione": 1.5})
+
+def test_partition_without_tenders_is_skipped(script_01, tmp_path):
+    list_cig = ["A", "B", "C", "D"]
+    list_logs = [tender_log(["A", "C", "D"]), award_log(["A", "B", "C"])]
+    df_single = script_01.finalize_event_log(script_01.merge_event_log([df.copy() for df in list_logs], list_cig))
+    # Four partitions (one case each): the one of case B has no TENDER_NOTICE event
+    df_parts = script_01.merge_event_log_partitions([df.copy() for df in list_logs], list_cig, None, 4, tmp_path / "spill")
+    assert df_parts["case_id"].unique().tolist() == ["A", "C", "D"]
+    pd.testing.assert_frame_equal(df_parts, df_single.reset_index(drop=True))
+
+def test_no_partition_with_tenders(script_01, tmp_path):
+    df_parts = script_01.merge_event_log_partitions([tender_log([]), award_log(["A", "B"])], ["A", "B"], None, 2, tmp_path / "spill")
+    assert len(df_parts) == 0
+    assert set(LIST_FILL + ["importo_aggiudicazione", "case_len"]) <= set(df_parts.columns)
@@ -0,0 +1,52 @@
+# test_duration_stats.py
+# Mergeable duration stats: running moments (Welford) and t-digest quantiles against NumPy
+
+import numpy as np
+import pytest
+
+from utility_manager.duration_stats import moments_new, moments_add, moments_merge, tdigest_new, tdigest_add, tdigest_merge, tdigest_quantile
+
+def batches_of(values: np.ndarray, batches_num: int) -> list:
+    """
+    Splits the values in batches of different sizes.
+    """
+    cuts = np.sort(np.random.default_rng(1).choice(np.arange(1, len(values)), batches_num - 1, replace=False))
+    return np.split(values, cuts)
+
+@pytest.fixture
+def durations() -> np.ndarray:
+    return np.random.default_rng(0).lognormal(mean=2.5, sigma=0.8, size=20000)
+
+def test_moments_merge_matches_numpy(durations):
+    list_moments = [moments_add(moments_new(), batch) for batch in batches_of(durations, 7)]
+    moments = moments_new()
+    for moments_batch in list_moments:
+        moments = moments_merge(moments, moments_batch)
+    assert moments["count"] == len(durations)
+    assert moments["mean"] == pytest.approx(np.mean(durations), rel=1e-12)
+    assert moments["m2"] / (moments["count"] - 1) == pytest.approx(np.var(durations, ddof=1), rel=1e-10)
+
+def test_moments_merge_with_empty():
+    moments = moments_add(moments_new(), np.array([1.0, 2.0, 4.0]))
+    assert moments_merge(moments_new(), moments) == moments
+    assert moments_merge(moments_new(), moments_new()) == moments_new()
+
+def test_tdigest_merge_matches_numpy(durations):
+    digest = tdigest_new()
+    for batch in batches_of(durations, 7):
+        digest = tdigest_merge(digest, tdigest_add(tdigest_new(), batch))
+    values_sorted = np.sort(durations)
+    assert tdigest_quantile(digest, 0.0) == values_sorted[0]
+    assert tdigest_quantile(digest, 1.0) == values_sorted[-1]
+    for q in [0.01, 0.1, 0.5, 0.9, 0.99]:
+        estimate = tdigest_quantile(digest, q)
+        # Error in rank (share of the values below the estimate)
+        assert abs(np.searchsorted(values_sorted, estimate) / len(values_sorted) - q) < 0.005
+        assert estimate == pytest.approx(np.quantile(durations, q), rel=0.02)
+
+def test_tdigest_of_few_values_is_exact_at_the_ends():
+    digest = tdigest_add(tdigest_new(), np.array([3.0, 1.0, 2.0]))
+    assert tdigest_quantile(digest, 0.0) == 1.0
+    assert tdigest_quantile(digest, 0.5) == 2.0
+    assert tdigest_quantile(digest, 1.0) == 3.0
+    assert np.isnan(tdigest_quantile(tdigest_new(), 0.5))
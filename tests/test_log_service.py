@@ -0,0 +1,48 @@
+# test_log_service.py
+# Queries of the resident event log (log_service.py): results, row limit and errors
+
+import pandas as pd
+import pytest
+
+def write_log(dir_log, cases_num: int = 30) -> None:
+    """
+    Writes an ordered event log of 'cases_num' cases with two events each.
+    """
+    list_rows = []
+    for case in range(cases_num):
+        for event_name, event_month in [("TENDER_NOTICE", 1), ("CONTRACT", 7)]:
+            list_rows.append({"case_id": f"C{case:03d}", "event_name": event_name, "event_timestamp": f"2020-{event_month:02d}-01 10:00:00",
+                              "oggetto_principale_contratto": "L" if case % 2 else "S", "importo_lotto": 1000.0 * (case + 1), "accordo_quadro": "0", "cpv_division": "45",
+                              "sezione_regionale": "LOMBARDIA" if case % 3 else "LAZIO", "cod_tipo_scelta_contraente": "1", "cod_modalita_realizzazione": "1", "case_len": 2})
+    pd.DataFrame(list_rows).to_csv(dir_log / "log.csv", sep=";", index=False)
+
+@pytest.fixture
+def service(log_service, tmp_path):
+    write_log(tmp_path)
+    return log_service.LogService(str(tmp_path), "log.csv", 10)
+
+def test_slice_is_capped_by_default(log_service, service, monkeypatch):
+    monkeypatch.setattr(log_service, "service_rows_limit", 5)
+    result = service.query("/slice", {})
+    assert result["count"] == 60
+    assert result["returned"] == 5
+    assert service.query("/slice", {"limit": ["100"]})["returned"] == 60
+
+def test_negative_limit_is_refused(service):
+    with pytest.raises(ValueError, match="limit"):
+        service.query("/slice", {"limit": ["-1"]})
+
+def test_events_need_the_cases(service):
+    with pytest.raises(ValueError, match="cig"):
+        service.query("/events", {})
+    assert service.query("/events", {"cig": ["C001", "C004"]})["count"] == 4
+
+def test_aggregate_names_the_unknown_column(service):
+    with pytest.raises(KeyError, match="'foo'"):
+        service.query("/aggregate", {"by": ["foo"]})
+    result = service.query("/aggregate", {"by": ["sezione_regionale"]})
+    assert {row["sezione_regionale"]: row["cases"] for row in result["rows"]} == {"LAZIO": 10, "LOMBARDIA": 20}
+
+def test_unknown_filter_column(service):
+    with pytest.raises(KeyError, match="'foo'"):
+        service.query("/slice", {"foo": ["1"]})
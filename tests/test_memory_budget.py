@@ -0,0 +1,33 @@
+# test_memory_budget.py
+# Memory estimates of the CSV files
+
+import gzip
+
+import numpy as np
+import pandas as pd
+
+from utility_manager.memory_budget import estimate_csv_memory, case_partition_bounds, df_case_partition
+
+def test_estimate_rows_of_a_plain_file(od_dir):
+    lines = "".join(f"C{row:05d};{row * 1.5};TEXT\n" for row in range(2000))
+    (od_dir / "TENDER.csv").write_text("cig;importo;stato\n" + lines)
+    row_bytes, rows_num = estimate_csv_memory(str(od_dir), "TENDER.csv", {"cig": object}, 100)
+    assert row_bytes > 0
+    assert 1800 <= rows_num <= 2200
+
+def test_estimate_of_a_stream_has_no_rows(od_dir):
+    with gzip.open(od_dir / "TENDER.csv.gz", "wt") as fp:
+        fp.write("cig;importo\nA;1\nB;2\n")
+    row_bytes, rows_num = estimate_csv_memory(str(od_dir), "TENDER.csv", {"cig": object}, 100)
+    assert row_bytes > 0
+    assert rows_num is None
+
+def test_partitions_follow_the_order_of_the_cases():
+    list_cases = [f"C{case:03d}" for case in range(100)]
+    bounds = case_partition_bounds(list_cases[::-1], 4)
+    assert len(bounds) == 3
+    df = pd.DataFrame({"case_id": list_cases + [None]})
+    partitions = df_case_partition(df, bounds)
+    assert (np.diff(partitions[:-1]) >= 0).all()
+    assert partitions[-1] == len(bounds)
+    assert sorted(np.bincount(partitions[:-1]).tolist()) == [25, 25, 25, 25]
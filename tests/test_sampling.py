@@ -0,0 +1,38 @@
+# test_sampling.py
+# The stratified sample of the cases is deterministic
+
+import pandas as pd
+
+from utility_manager.sampling import sample_cases
+
+def tenders(cases_num: int = 1000) -> pd.DataFrame:
+    """
+    A main tender file with two strata columns.
+    """
+    return pd.DataFrame({"cig": [f"CIG{case:05d}" for case in range(cases_num)],
+                         "oggetto_principale_contratto": [["L", "S", "F"][case % 3] for case in range(cases_num)],
+                         "sezione_regionale": [["LAZIO", "LOMBARDIA"][case % 2] for case in range(cases_num)]})
+
+LIST_STRATA = ["oggetto_principale_contratto", "sezione_regionale"]
+
+def test_same_seed_same_sample():
+    df = tenders()
+    list_sample = sample_cases(df, 0.1, LIST_STRATA, "seed")
+    assert sample_cases(df, 0.1, LIST_STRATA, "seed") == list_sample
+    # The order of the rows (and repeated rows of a case) do not change the sample
+    df_shuffled = pd.concat([df, df.head(50)]).sample(frac=1, random_state=3)
+    assert sorted(sample_cases(df_shuffled, 0.1, LIST_STRATA, "seed")) == sorted(list_sample)
+
+def test_sample_by_stratum():
+    df = tenders()
+    set_sample = set(sample_cases(df, 0.1, LIST_STRATA, "seed"))
+    df_sample = df[df["cig"].isin(set_sample)]
+    # Six strata of about 167 cases: 10% of each, rounded up
+    assert df_sample.groupby(LIST_STRATA).size().tolist() == [17] * 6
+    assert set(sample_cases(df, 0.1, LIST_STRATA, "other seed")) != set_sample
+
+def test_samples_are_nested():
+    df = tenders()
+    set_small = set(sample_cases(df, 0.05, LIST_STRATA, "seed"))
+    assert set_small <= set(sample_cases(df, 0.2, LIST_STRATA, "seed"))
+    assert set(sample_cases(df, 1.0, LIST_STRATA, "seed")) == set(df["cig"])
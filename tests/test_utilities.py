@@ -0,0 +1,59 @@
+# test_utilities.py
+# Reading the Open Data files: plain and compressed sources, chunks and duplicates
+
+import gzip
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from utility_manager import utilities
+from utility_manager.utilities import df_read_csv, df_read_csv_chunks
+
+CSV_TEXT = "cig;importo;stato\nA;1.5;X\nB;2;Y\nA;1.5;X\nC;;Z\nB;2;Y\nD;4;W\n"
+
+def write_source(od_dir, kind: str) -> None:
+    """
+    Writes TENDER.csv as a plain, '.gz' or '.zip' file.
+    """
+    if kind == "plain":
+        (od_dir / "TENDER.csv").write_text(CSV_TEXT)
+    elif kind == "gz":
+        with gzip.open(od_dir / "TENDER.csv.gz", "wt") as fp:
+            fp.write(CSV_TEXT)
+    else:
+        with zipfile.ZipFile(od_dir / "TENDER.zip", "w") as zip_file:
+            zip_file.writestr("TENDER.csv", CSV_TEXT)
+
+@pytest.mark.parametrize("kind", ["plain", "gz", "zip"])
+@pytest.mark.parametrize("chunk_rows", [1, 2, 4, 100])
+def test_chunked_read_matches_whole_read(od_dir, kind, chunk_rows):
+    write_source(od_dir, kind)
+    df_whole = df_read_csv(str(od_dir), "TENDER.csv", [], {"cig": object, "stato": object}, None)
+    df_chunked = df_read_csv(str(od_dir), "TENDER.csv", [], {"cig": object, "stato": object}, None, chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(df_chunked, df_whole)
+    assert list(df_whole["cig"]) == ["A", "B", "C", "D"]
+
+def test_chunks_keep_only_the_keys(od_dir):
+    write_source(od_dir, "plain")
+    df = pd.concat(list(df_read_csv_chunks(str(od_dir), "TENDER.csv", ["stato"], {"cig": object}, chunk_rows=2, list_keys=["B", "D"])))
+    assert list(df["cig"]) == ["B", "D"]
+    assert list(df.columns) == ["cig", "importo"]
+    assert list(df.index) == [1, 5]
+
+@pytest.mark.parametrize("kind", ["gz", "zip"])
+def test_chunked_read_opens_the_source_once(od_dir, kind, monkeypatch):
+    write_source(od_dir, kind)
+    list_opened = []
+    od_file_open = utilities.od_file_open
+
+    @contextmanager
+    def od_file_open_counted(dir_name, file_name):
+        list_opened.append(file_name)
+        with od_file_open(dir_name, file_name) as source:
+            yield source
+
+    monkeypatch.setattr(utilities, "od_file_open", od_file_open_counted)
+    df_read_csv(str(od_dir), "TENDER.csv", [], {"cig": object}, None, chunk_rows=2, list_keys=["A"])
+    assert list_opened == ["TENDER.csv"]
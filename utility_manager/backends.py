@@ -0,0 +1,252 @@
+from pathlib import Path
+import contextlib
+import csv
+import io
+import re
+import numpy as np
+import pandas as pd
+
+from utility_manager.utilities import df_read_csv, df_read_csv_chunks, od_file_open
+from utility_manager.csv_writer import df_write_csv
+from utility_manager.memory_budget import df_memory_bytes
+
+EXECUTION_BACKENDS = ["pandas", "arrow"] # backends supported by execution_backend
+CSV_NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"] # missing values of pd.read_csv
+ARROW_VERSION_MIN = 14 # pyarrow major version needed by the 'arrow' backend (concat_tables with promote_options)
+CSV_BOOL_VALUES = {"True": True, "TRUE": True, "true": True, "False": False, "FALSE": False, "false": False} # booleans of pd.read_csv
+ARROW_DATE_DIRECTIVES = ["%Y", "%m", "%d", "%H", "%M", "%S"] # directives parsed by Arrow as pd.to_datetime does (other formats are parsed by pandas)
+
+def execution_backend(backend_name: str):
+    """
+    Returns the backend running the core operations of the scripts (EXECUTION_BACKEND).
+
+    Parameters:
+        backend_name (str): 'pandas' or 'arrow'.
+
+    Returns:
+        The backend (PandasBackend or ArrowBackend).
+    """
+    if backend_name == "pandas":
+        return PandasBackend()
+    if backend_name == "arrow":
+        return ArrowBackend()
+    raise ValueError(f"Backend '{backend_name}' not supported ({', '.join(EXECUTION_BACKENDS)})")
+
+class PandasBackend:
+    """
+    Core operations on pandas dataframes (single-threaded, in memory). The frames of this backend are dataframes.
+    """
+    name = "pandas"
+
+    def read_csv(self, dir_name: str, file_name: str, list_col_exc: list, list_col_type: dict, csv_sep: str = ";", chunk_rows: int = None, list_keys: list = None, key_col: str = "cig") -> pd.DataFrame:
+        """
+        Reads a CSV file as df_read_csv: the labels are the row positions in the file, the duplicated rows are removed.
+        Projection: the columns of 'list_col_exc' are not returned; filter: only the rows whose 'key_col' is in 'list_keys' (if given).
+        """
+        return df_read_csv(dir_name, file_name, list_col_exc, list_col_type, None, csv_sep, chunk_rows, list_keys, key_col)
+
+    def read_csv_chunks(self, dir_name: str, file_name: str, list_col_exc: list, list_col_type: dict, csv_sep: str = ";", chunk_rows: int = None, list_keys: list = None, key_col: str = "cig"):
+        """
+        Reads a CSV file chunk by chunk as df_read_csv_chunks (a generator of dataframes with the rows of read_csv).
+        """
+        return df_read_csv_chunks(dir_name, file_name, list_col_exc, list_col_type, csv_sep, chunk_rows, list_keys, key_col)
+
+    def from_pandas(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df
+
+    def to_pandas(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return frame
+
+    def memory_bytes(self, frame: pd.DataFrame) -> int:
+        """
+        Returns the memory used by the frame (see df_memory_bytes).
+        """
+        return df_memory_bytes(frame)
+
+    def semi_join(self, frame: pd.DataFrame, list_keys: list, key_col: str) -> pd.DataFrame:
+        """
+        Keeps the rows whose 'key_col' is in 'list_keys'.
+        """
+        return frame[frame[key_col].isin(list_keys)]
+
+    def concat(self, list_frames: list) -> pd.DataFrame:
+        """
+        Concatenates the frames (the columns missing in a frame are filled with missing values).
+        """
+        return pd.concat(list_frames, ignore_index=True)
+
+    def to_datetime(self, frame: pd.DataFrame, col: str, date_format: str = None) -> pd.DataFrame:
+        """
+        Converts the column to timestamps (with 'date_format', else the format of its first value).
+        """
+        frame[col] = pd.to_datetime(frame[col], format=date_format)
+        return frame
+
+    def sort(self, frame: pd.DataFrame, list_by: list) -> pd.DataFrame:
+        """
+        Sorts the frame by the columns (stable: the ties keep their order).
+        """
+        return frame.sort_values(by=list_by)
+
+    def group_count(self, frame: pd.DataFrame, key_col: str, col_out: str) -> pd.DataFrame:
+        """
+        Adds to every row the number of rows of its group.
+        """
+        frame[col_out] = frame.groupby(key_col)[key_col].transform('count')
+        return frame
+
+    def group_agg(self, frame: pd.DataFrame, key_col: str, dic_agg: dict) -> pd.DataFrame:
+        """
+        Aggregates the groups: 'first', 'last' (first and last non-missing value) or 'count' (non-missing values) for every column.
+
+        Returns:
+            pd.DataFrame: a row per group (ordered by key) with the key and the aggregated columns.
+        """
+        return frame.groupby(key_col).agg(dic_agg).reset_index()
+
+    def write_csv(self, df: pd.DataFrame, path_out: str, csv_sep: str, quoting: int, compression: str = None, workers: int = 1, chunk_rows: int = 100000) -> Path:
+        return df_write_csv(df, path_out, csv_sep, quoting, compression, workers, chunk_rows)
+
+class ArrowBackend(PandasBackend):
+    """
+    Core operations on Arrow tables (pyarrow): CSV files are parsed on all the cores as a stream of record batches, filtered while reading. The frames of this backend are Arrow tables.
+    The backend speeds up the parsing and the filters: it is in memory as PandasBackend (every file is read whole, the tables are converted to dataframes) and group_agg runs on a single thread.
+    The results are the ones of PandasBackend: the files are read with the types of pd.read_csv, the sorts are stable and the CSV files are written with the text of pandas (df_write_csv).
+    """
+    name = "arrow"
+
+    def __init__(self):
+        try:
+            import pyarrow # optional dependency, only needed by the 'arrow' backend
+            import pyarrow.compute
+            import pyarrow.csv
+        except ImportError as exc:
+            raise ImportError(f"The package 'pyarrow' (>= {ARROW_VERSION_MIN}) is needed by the 'arrow' backend (pip install pyarrow)") from exc
+        if int(pyarrow.__version__.split(".")[0]) < ARROW_VERSION_MIN:
+            raise ImportError(f"The 'arrow' backend needs pyarrow >= {ARROW_VERSION_MIN} (found {pyarrow.__version__})")
+        # The tables use the allocator of pandas and NumPy: the memory freed by Arrow is reused by the dataframes (the default pool keeps it)
+        pyarrow.set_memory_pool(pyarrow.system_memory_pool())
+        self.pa = pyarrow
+
+    def arrow_type(self, col_type):
+        """
+        Returns the Arrow type of a type of pd.read_csv (a ValueError if the type is not supported by the backend).
+        """
+        type_name = col_type if isinstance(col_type, str) else getattr(col_type, "__name__", str(col_type))
+        dic_types = {"object": self.pa.string(), "str": self.pa.string(), "int": self.pa.int64(), "int64": self.pa.int64(), "float": self.pa.float64(), "float64": self.pa.float64()}
+        if type_name not in dic_types:
+            raise ValueError(f"Column type '{type_name}' not supported by the 'arrow' backend ({', '.join(dic_types)})")
+        return dic_types[type_name]
+
+    def read_csv(self, dir_name: str, file_name: str, list_col_exc: list, list_col_type: dict, csv_sep: str = ";", chunk_rows: int = None, list_keys: list = None, key_col: str = "cig") -> pd.DataFrame:
+        """
+        Reads a CSV file as df_read_csv, parsing it in parallel as a stream of record batches: the rows of the other keys are dropped from every batch.
+        The columns without a type are read as text and converted as pd.read_csv does (integers, floats, booleans or text); a declared type that Arrow cannot read as pd.read_csv does raises a ValueError.
+        """
+        pa = self.pa
+        list_batches = []
+        list_positions = [] # row positions in the file (the labels of df_read_csv)
+        row_start = 0
+        with od_file_open(dir_name, file_name) as source:
+            # The file is opened once: the header is read from the stream, the rest is parsed by Arrow
+            with (open(source, "rb") if isinstance(source, Path) else contextlib.nullcontext(source)) as stream:
+                list_cols = next(csv.reader(io.StringIO(stream.readline().decode("utf-8-sig")), delimiter=csv_sep))
+                list_cols_read = [col for col in list_cols if col not in list_col_exc]
+                # The columns without a type (also from the default of a defaultdict, as pd.read_csv) are inferred
+                has_default = getattr(list_col_type, "default_factory", None) is not None
+                dic_arrow_types = {col: self.arrow_type(list_col_type[col]) if col in list_col_type or has_default else None for col in list_cols_read}
+                list_cols_infer = [col for col, arrow_type in dic_arrow_types.items() if arrow_type is None]
+                convert_options = pa.csv.ConvertOptions(column_types={col: arrow_type or pa.string() for col, arrow_type in dic_arrow_types.items()}, include_columns=list_cols_read, null_values=CSV_NA_VALUES, strings_can_be_null=True, quoted_strings_can_be_null=True)
+                value_set = None
+                if list_keys is not None and key_col in list_cols_read:
+                    value_set = pa.array([key if isinstance(key, str) else None for key in list_keys], type=pa.string())
+                reader = pa.csv.open_csv(stream, read_options=pa.csv.ReadOptions(use_threads=True, column_names=list_cols), parse_options=pa.csv.ParseOptions(delimiter=csv_sep, newlines_in_values=True), convert_options=convert_options)
+                for batch in reader:
+                    positions = np.arange(row_start, row_start + batch.num_rows)
+                    row_start += batch.num_rows
+                    if value_set is not None:
+                        mask = pa.compute.is_in(batch.column(key_col), value_set=value_set)
+                        batch = batch.filter(mask)
+                        positions = positions[mask.to_numpy(zero_copy_only=False)]
+                    list_batches.append(batch)
+                    list_positions.append(positions)
+                schema = reader.schema
+
+        # The batches are released while they are converted (a single copy of the data at a time)
+        table = pa.Table.from_batches(list_batches, schema=schema)
+        del list_batches
+        list_cols_null = [field.name for field in schema if pa.types.is_string(field.type) and table.column(field.name).null_count > 0]
+        df = self.to_pandas(table)
+        del table
+        df.index = np.concatenate(list_positions) if len(list_positions) > 0 else np.empty(0, dtype=int)
+        # The missing text values are NaN as in pd.read_csv (None in Arrow)
+        for col in list_cols_null:
+            df[col] = df[col].fillna(np.nan)
+        for col in list_cols_infer:
+            df[col] = infer_csv_column(df[col])
+        return df.drop_duplicates()
+
+    def from_pandas(self, df):
+        # The frames already in Arrow (e.g., the event logs kept until the merge) are returned as they are
+        if isinstance(df, self.pa.Table):
+            return df
+        return self.pa.Table.from_pandas(df, preserve_index=False)
+
+    def to_pandas(self, frame) -> pd.DataFrame:
+        # The columns are released while they are converted: the frame cannot be used afterwards
+        return frame.to_pandas(split_blocks=True, self_destruct=True)
+
+    def memory_bytes(self, frame) -> int:
+        return int(frame.nbytes) if isinstance(frame, self.pa.Table) else df_memory_bytes(frame)
+
+    def semi_join(self, frame, list_keys: list, key_col: str):
+        pa = self.pa
+        value_set = pa.array([key if isinstance(key, str) else None for key in list_keys], type=pa.string())
+        return frame.filter(pa.compute.is_in(frame.column(key_col), value_set=value_set))
+
+    def concat(self, list_frames: list):
+        # The schemas are unified (columns in order of appearance, missing columns as nulls) as pd.concat does
+        return self.pa.concat_tables(list_frames, promote_options="permissive")
+
+    def to_datetime(self, frame, col: str, date_format: str = None):
+        # Arrow parses the formats made of numeric directives only; without a format (or with 'mixed', a time zone, fractions of seconds, ...) the column is parsed by pandas
+        pa = self.pa
+        column = frame.column(col)
+        if date_format is not None and "%" in date_format and pa.types.is_string(column.type) and all(directive in ARROW_DATE_DIRECTIVES for directive in re.findall(r"%.", date_format)):
+            column = pa.compute.strptime(column, format=date_format, unit="ns")
+        else:
+            column = pa.array(pd.to_datetime(column.to_pandas(), format=date_format), from_pandas=True)
+        return frame.set_column(frame.schema.get_field_index(col), col, column)
+
+    def sort(self, frame, list_by: list):
+        return frame.sort_by([(col, "ascending") for col in list_by])
+
+    def group_count(self, frame, key_col: str, col_out: str):
+        pa = self.pa
+        df_counts = frame.group_by(key_col).aggregate([(key_col, "count")])
+        positions = pa.compute.index_in(frame.column(key_col), value_set=df_counts.column(key_col))
+        return frame.append_column(col_out, pa.compute.take(df_counts.column(f"{key_col}_count"), positions))
+
+    def group_agg(self, frame, key_col: str, dic_agg: dict) -> pd.DataFrame:
+        # 'first' and 'last' depend on the order of the rows: the groups are aggregated by a single thread
+        table_agg = frame.group_by(key_col, use_threads=False).aggregate([(col, agg) for col, agg in dic_agg.items()])
+        df_agg = table_agg.to_pandas().rename(columns={f"{col}_{agg}": col for col, agg in dic_agg.items()})
+        return df_agg.dropna(subset=[key_col]).sort_values(key_col).reset_index(drop=True)[[key_col] + list(dic_agg)]
+
+def infer_csv_column(series: pd.Series) -> pd.Series:
+    """
+    Converts a column read as text to the type that pd.read_csv infers: integers, floats (also integers with missing values), booleans or text.
+
+    Parameters:
+        series (pd.Series): the column read as text (missing values as None).
+
+    Returns:
+        pd.Series: the converted column.
+    """
+    series_values = series.dropna()
+    if len(series_values) > 0 and series_values.isin(list(CSV_BOOL_VALUES)).all():
+        return series.map(CSV_BOOL_VALUES) if len(series_values) == len(series) else series.map(CSV_BOOL_VALUES).astype(object)
+    try:
+        return pd.to_numeric(series)
+    except (ValueError, TypeError):
+        return series
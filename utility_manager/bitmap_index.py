@@ -0,0 +1,163 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+def bitmap_index_path(path_data: str) -> Path:
+    """
+    Returns the path of the bitmap index of a CSV file (saved next to it, e.g. 'log.csv' -> 'log_index.npz').
+
+    Parameters:
+        path_data (str): the path of the indexed CSV file.
+
+    Returns:
+        Path: the path of the index file.
+    """
+    path_data = Path(path_data)
+    return path_data.with_name(f"{path_data.stem}_index.npz")
+
+def bitmap_index_build(df: pd.DataFrame, list_cols: list, amount_col: str = None, list_amount_bounds: list = []) -> dict:
+    """
+    Builds a bitmap index over the row positions of the dataframe (i.e., the rows of the CSV file written from it).
+    Every distinct value of the indexed columns gets a bitmap (one bit per row, packed in bytes) and, if an amount column is given, every amount bucket gets a bitmap too.
+    The buckets are closed on the right: (-inf, b0], (b0, b1], ..., (bn, +inf); missing amounts are not in any bucket.
+
+    Parameters:
+        df (pd.DataFrame): the dataframe to be indexed (in the order of the rows in the file).
+        list_cols (list): the low-cardinality columns to be indexed (missing columns are skipped).
+        amount_col (str): the amount column to be indexed by buckets (None to skip it).
+        list_amount_bounds (list): the bounds of the amount buckets.
+
+    Returns:
+        dict: the index with the number of rows, the amount bounds and the bitmaps by column and value.
+    """
+    index = {"rows": len(df), "amount_col": amount_col, "amount_bounds": sorted(float(bound) for bound in list_amount_bounds), "bitmaps": {}}
+    for col in list_cols:
+        if col not in df.columns:
+            print(f"Warning: the column '{col}' is not in the dataframe, not indexed")
+            continue
+        # codes: position of the value of each row in the list of distinct values (-1 if missing)
+        codes, values = pd.factorize(df[col], sort=True)
+        index["bitmaps"][col] = {str(value): np.packbits(codes == code) for code, value in enumerate(values)}
+    if amount_col is not None and amount_col in df.columns:
+        amounts = df[amount_col].to_numpy(dtype=float)
+        buckets = np.searchsorted(index["amount_bounds"], amounts, side="left") # bucket i: (bound i-1, bound i]
+        buckets[np.isnan(amounts)] = -1
+        index["bitmaps"][f"{amount_col}#bucket"] = {str(bucket): np.packbits(buckets == bucket) for bucket in range(len(index["amount_bounds"]) + 1)}
+    return index
+
+def bitmap_index_save(index: dict, path_index: str, path_data: str = None) -> None:
+    """
+    Saves the bitmap index in a compressed NumPy file ('.npz').
+
+    Parameters:
+        index (dict): the index (see bitmap_index_build).
+        path_index (str): the path of the index file.
+        path_data (str): the path of the indexed CSV file (its size and modification time are saved to detect a stale index).
+
+    Returns:
+        None
+    """
+    meta = {"rows": index["rows"], "amount_col": index["amount_col"], "amount_bounds": index["amount_bounds"], "keys": [], "data": None}
+    if path_data is not None:
+        data_stat = Path(path_data).stat()
+        meta["data"] = {"size": data_stat.st_size, "mtime_ns": data_stat.st_mtime_ns}
+    dic_arrays = {}
+    for col, dic_bitmaps in index["bitmaps"].items():
+        for value, bitmap in dic_bitmaps.items():
+            dic_arrays[f"b{len(meta['keys'])}"] = bitmap
+            meta["keys"].append([col, value])
+    dic_arrays["meta"] = np.array(json.dumps(meta))
+    with open(path_index, 'wb') as file:
+        np.savez_compressed(file, **dic_arrays)
+
+def bitmap_index_load(path_index: str, path_data: str = None) -> dict:
+    """
+    Loads a bitmap index saved by bitmap_index_save.
+
+    Parameters:
+        path_index (str): the path of the index file.
+        path_data (str): the path of the indexed CSV file (if given, the index is discarded when the file has changed).
+
+    Returns:
+        dict: the index (None if the index file does not exist or is stale).
+    """
+    if not Path(path_index).exists():
+        return None
+    with np.load(path_index) as npz:
+        meta = json.loads(str(npz["meta"]))
+        if path_data is not None and meta["data"] is not None:
+            data_stat = Path(path_data).stat()
+            if meta["data"] != {"size": data_stat.st_size, "mtime_ns": data_stat.st_mtime_ns}:
+                print(f"Warning: the index '{path_index}' is older than '{path_data}', not used")
+                return None
+        index = {"rows": meta["rows"], "amount_col": meta["amount_col"], "amount_bounds": meta["amount_bounds"], "bitmaps": {}}
+        for key_pos, (col, value) in enumerate(meta["keys"]):
+            index["bitmaps"].setdefault(col, {})[value] = npz[f"b{key_pos}"]
+    return index
+
+def bitmap_index_amount_buckets(index: dict, amount_gt: float = None, amount_le: float = None) -> list:
+    """
+    Returns the amount buckets covering exactly the amounts greater than 'amount_gt' and lower or equal to 'amount_le'.
+
+    Parameters:
+        index (dict): the index (see bitmap_index_build).
+        amount_gt (float): the amounts must be greater than this value (None for no lower limit).
+        amount_le (float): the amounts must be lower or equal to this value (None for no upper limit).
+
+    Returns:
+        list: the bucket numbers (as strings, the keys of the bitmaps).
+    """
+    list_bounds = index["amount_bounds"]
+    for amount in [amount_gt, amount_le]:
+        if amount is not None and float(amount) not in list_bounds:
+            raise ValueError(f"The amount {amount} is not a bound of the index buckets {list_bounds}")
+    bucket_first = 0 if amount_gt is None else list_bounds.index(float(amount_gt)) + 1
+    bucket_last = len(list_bounds) if amount_le is None else list_bounds.index(float(amount_le))
+    return [str(bucket) for bucket in range(bucket_first, bucket_last + 1)]
+
+def bitmap_index_query(index: dict, dic_filters: dict, amount_gt: float = None, amount_le: float = None) -> np.ndarray:
+    """
+    Selects the rows matching the filters: the values of a column are in OR, the columns (and the amount range) are in AND.
+
+    Parameters:
+        index (dict): the index (see bitmap_index_build).
+        dic_filters (dict): the values to be kept for each indexed column (e.g., {"sezione_regionale": ["LOMBARDIA"], "oggetto_principale_contratto": ["W"]}).
+        amount_gt (float): the amounts must be greater than this value (None for no lower limit, must be a bucket bound).
+        amount_le (float): the amounts must be lower or equal to this value (None for no upper limit, must be a bucket bound).
+
+    Returns:
+        np.ndarray: the positions of the matching rows (in ascending order).
+    """
+    rows_num = index["rows"]
+    bitmap_all = np.packbits(np.ones(rows_num, dtype=bool))
+    bitmap_empty = np.zeros_like(bitmap_all)
+    dic_filters = dict(dic_filters)
+    if amount_gt is not None or amount_le is not None:
+        dic_filters[f"{index['amount_col']}#bucket"] = bitmap_index_amount_buckets(index, amount_gt, amount_le)
+    bitmap_result = bitmap_all
+    for col, list_values in dic_filters.items():
+        if col not in index["bitmaps"]:
+            raise KeyError(f"The column '{col}' is not indexed")
+        dic_bitmaps = index["bitmaps"][col]
+        # OR of the values of the column (values not in the index match no rows)
+        bitmap_col = bitmap_empty
+        for value in list_values:
+            if str(value) in dic_bitmaps:
+                bitmap_col = np.bitwise_or(bitmap_col, dic_bitmaps[str(value)])
+        bitmap_result = np.bitwise_and(bitmap_result, bitmap_col)
+    return np.flatnonzero(np.unpackbits(bitmap_result, count=rows_num))
+
+def bitmap_index_slice(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """
+    Materialises the rows of a query from a dataframe read from the indexed file.
+    The labels of the dataframe must be the row positions in the file (as returned by df_read_csv, also after removing duplicates).
+
+    Parameters:
+        df (pd.DataFrame): the dataframe read from the indexed file.
+        positions (np.ndarray): the positions of the rows (see bitmap_index_query).
+
+    Returns:
+        pd.DataFrame: the matching rows (in the order of the file).
+    """
+    return df.loc[df.index.intersection(positions)]
@@ -0,0 +1,100 @@
+import json
+import hashlib
+from pathlib import Path
+import pandas as pd
+
+CHECKPOINT_MANIFEST = "manifest.json" # list of the completed stages of a run
+CHECKPOINT_SUFFIX = ".pkl"            # stages are saved in the pickle binary format (fast to write and read back)
+
+def checkpoint_fingerprint(list_files: list, dic_settings: dict = None) -> str:
+    """
+    Computes a fingerprint of the inputs of a run, so that a run is never resumed from checkpoints created with different inputs.
+
+    Parameters:
+        list_files (list): the paths of the input files (data and configurations) of the run.
+        dic_settings (dict): the settings (e.g., of config.yml) read by the stages of the run.
+
+    Returns:
+        str: the fingerprint (hash of the names, sizes and modification times of the files and of the settings).
+    """
+    hash_files = hashlib.sha1()
+    for file_name in sorted(str(file) for file in list_files):
+        path_file = Path(file_name)
+        file_stat = path_file.stat() if path_file.exists() else None
+        file_info = f"{file_name}|{file_stat.st_size}|{file_stat.st_mtime_ns}" if file_stat else f"{file_name}|missing"
+        hash_files.update(file_info.encode("utf-8"))
+    if dic_settings:
+        hash_files.update(json.dumps(dic_settings, sort_keys=True, default=str).encode("utf-8"))
+    return hash_files.hexdigest()
+
+def checkpoint_open(run_dir: str, fingerprint: str, resume: bool) -> list:
+    """
+    Prepares the directory of a run and returns the stages already completed (to be resumed).
+    If the run is not resumed (or its inputs have changed) the previous checkpoints are discarded.
+
+    Parameters:
+        run_dir (str): the directory of the run.
+        fingerprint (str): the fingerprint of the inputs of the run (see checkpoint_fingerprint).
+        resume (bool): True to resume the run from its last completed stage.
+
+    Returns:
+        list: the names of the completed stages (empty if the run starts from scratch).
+    """
+    path_run = Path(run_dir)
+    path_run.mkdir(parents=True, exist_ok=True)
+    path_manifest = path_run / CHECKPOINT_MANIFEST
+    manifest = {"fingerprint": fingerprint, "stages": []}
+    if resume and path_manifest.exists():
+        with open(path_manifest, 'r') as file:
+            manifest_old = json.load(file)
+        if manifest_old.get("fingerprint") == fingerprint:
+            return manifest_old.get("stages", [])
+        print("Warning: the inputs have changed since the last run, the checkpoints are discarded")
+    # New run: remove the stages of the previous one
+    for path_stage in path_run.glob(f"*{CHECKPOINT_SUFFIX}"):
+        path_stage.unlink()
+    with open(path_manifest, 'w') as file:
+        json.dump(manifest, file, indent=4)
+    return []
+
+def checkpoint_save(run_dir: str, stage: str, data) -> None:
+    """
+    Saves the result of a stage (a DataFrame or any other Python object) and marks the stage as completed.
+    The file is written under a temporary name and then renamed, so that a crash while writing never leaves a broken checkpoint.
+
+    Parameters:
+        run_dir (str): the directory of the run.
+        stage (str): the name of the stage.
+        data: the result of the stage.
+
+    Returns:
+        None
+    """
+    path_run = Path(run_dir)
+    path_stage = path_run / f"{stage}{CHECKPOINT_SUFFIX}"
+    path_tmp = path_run / f"{stage}{CHECKPOINT_SUFFIX}.tmp"
+    pd.to_pickle(data, path_tmp)
+    path_tmp.replace(path_stage)
+    path_manifest = path_run / CHECKPOINT_MANIFEST
+    with open(path_manifest, 'r') as file:
+        manifest = json.load(file)
+    if stage not in manifest["stages"]:
+        manifest["stages"].append(stage)
+    with open(path_manifest, 'w') as file:
+        json.dump(manifest, file, indent=4)
+    print(f"Checkpoint saved: {path_stage}")
+
+def checkpoint_load(run_dir: str, stage: str):
+    """
+    Loads the result of a completed stage.
+
+    Parameters:
+        run_dir (str): the directory of the run.
+        stage (str): the name of the stage.
+
+    Returns:
+        The result of the stage as saved by checkpoint_save.
+    """
+    path_stage = Path(run_dir) / f"{stage}{CHECKPOINT_SUFFIX}"
+    print(f"Checkpoint loaded: {path_stage}")
+    return pd.read_pickle(path_stage)
@@ -0,0 +1,185 @@
+import contextlib
+import csv
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+from utility_manager.bitmap_index import bitmap_index_path
+
+CSV_COMPRESSION_SUFFIX = {"gzip": ".gz", "zstd": ".zst"} # compressions supported by df_write_csv
+
+def csv_workers_count(workers_value) -> int:
+    """
+    Converts the number of workers of the configuration (CSV_WRITE_WORKERS).
+
+    Parameters:
+        workers_value: the number of workers or 'auto' (one per CPU).
+
+    Returns:
+        int: the number of workers (at least 1).
+    """
+    if str(workers_value).lower() == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(workers_value))
+
+def df_format_datetime_columns(df: pd.DataFrame, csv_sep: str = ";") -> pd.DataFrame:
+    """
+    Replaces the datetime columns of the dataframe with their text as written by 'to_csv'.
+    The text of a datetime column depends on all its values (e.g., the time is omitted only if it is midnight for every row): formatting the whole column once keeps every block of rows identical to a single 'to_csv' call.
+    The input dataframe is not copied: the returned dataframe shares its other columns.
+
+    Parameters:
+        df (pd.DataFrame): the dataframe to be written.
+        csv_sep (str): the CSV separator.
+
+    Returns:
+        pd.DataFrame: the dataframe with the datetime columns as text (the input dataframe if it has no datetime columns).
+    """
+    list_col_datetime = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+    if len(list_col_datetime) == 0:
+        return df
+    dic_col_text = {}
+    for col in list_col_datetime:
+        text_col = df[[col]].to_csv(None, sep=csv_sep, index=False, header=False, na_rep="NaT", quoting=csv.QUOTE_NONE, lineterminator="\n")
+        list_text = text_col.split("\n")[:-1]
+        # Missing values are written as empty strings (as missing values)
+        dic_col_text[col] = pd.Series(list_text, index=df.index, dtype=object).replace("NaT", None)
+    # Shallow frame: only the datetime columns are new
+    return pd.DataFrame({col: dic_col_text.get(col, df[col]) for col in df.columns}, index=df.index, copy=False)
+
+def df_as_read_csv(df: pd.DataFrame, csv_sep: str = ";") -> pd.DataFrame:
+    """
+    Returns the dataframe as it would be read back by df_read_csv after writing it with df_write_csv: datetime columns as text, row labels as positions in the file and duplicated rows removed.
+    Used to hand a dataframe to the next script in memory instead of through its CSV file.
+
+    Parameters:
+        df (pd.DataFrame): the dataframe to be handed over.
+        csv_sep (str): the CSV separator.
+
+    Returns:
+        pd.DataFrame: the dataframe as read from its CSV file.
+    """
+    df = df_format_datetime_columns(df, csv_sep)
+    return df.reset_index(drop=True).drop_duplicates()
+
+def csv_remove_siblings(path_out: Path) -> list:
+    """
+    Removes the copies of an output file in the other formats (e.g., 'log.csv' and 'log.csv.zst' when 'log.csv.gz' is written) with their bitmap indexes.
+    The readers look for the plain file first: a copy left by a run with another compression would be read instead of the new file.
+
+    Parameters:
+        path_out (Path): the path of the file written.
+
+    Returns:
+        list: the paths of the files removed.
+    """
+    path_plain = path_out
+    if path_out.suffix in CSV_COMPRESSION_SUFFIX.values():
+        path_plain = path_out.with_name(path_out.stem)
+    list_siblings = [path_plain] + [path_plain.with_name(f"{path_plain.name}{suffix}") for suffix in CSV_COMPRESSION_SUFFIX.values()]
+    list_removed = []
+    for path_sibling in list_siblings:
+        if path_sibling == path_out:
+            continue
+        for path_file in [path_sibling, bitmap_index_path(path_sibling)]:
+            if path_file.exists():
+                path_file.unlink()
+                list_removed.append(path_file)
+    return list_removed
+
+def csv_format_block(df_block: pd.DataFrame, header: bool, csv_sep: str, quoting: int) -> bytes:
+    """
+    Formats a block of rows as CSV text (run by the workers of df_write_csv).
+
+    Parameters:
+        df_block (pd.DataFrame): the rows to be formatted.
+        header (bool): True to write the header (only for the first block).
+        csv_sep (str): the CSV separator.
+        quoting (int): the quoting of the CSV module (e.g., csv.QUOTE_MINIMAL).
+
+    Returns:
+        bytes: the CSV text of the block (UTF-8).
+    """
+    return df_block.to_csv(None, sep=csv_sep, index=False, header=header, quoting=quoting).encode("utf-8")
+
+def csv_open_output(file_raw, path_out: Path, compression: str):
+    """
+    Wraps the output file (binary), compressed if needed.
+
+    Parameters:
+        file_raw: the binary file object where the bytes are written (it is not closed).
+        path_out (Path): the final path of the output file (the name saved in the gzip header).
+        compression (str): None, 'gzip' or 'zstd'.
+
+    Returns:
+        The binary file object to be written.
+    """
+    if compression == "gzip":
+        # mtime=0 keeps the compressed file identical between runs
+        return gzip.GzipFile(filename=str(path_out), mode="wb", fileobj=file_raw, mtime=0)
+    if compression == "zstd":
+        try:
+            import zstandard # optional dependency, only needed for '.zst' files
+        except ImportError as exc:
+            raise ImportError(f"The package 'zstandard' is needed to write '{path_out}' (pip install zstandard)") from exc
+        return zstandard.ZstdCompressor().stream_writer(file_raw, closefd=False)
+    return contextlib.nullcontext(file_raw)
+
+def df_write_csv(df: pd.DataFrame, path_out: str, csv_sep: str = ";", quoting: int = csv.QUOTE_MINIMAL, compression: str = None, workers: int = 1, chunk_rows: int = 100000, executor: str = "process") -> Path:
+    """
+    Writes a dataframe to a CSV file formatting blocks of rows in parallel and writing them in order.
+    The output is byte for byte the one of 'df.to_csv(path_out, sep=csv_sep, index=False, quoting=quoting)' (compressed if needed).
+    The file is written next to the target and then moved in its place, so readers never see a partial file; its copies in the other formats are removed (see csv_remove_siblings).
+
+    Parameters:
+        df (pd.DataFrame): the dataframe to be written.
+        path_out (str): the path of the CSV file (the compression suffix, e.g. '.gz', is added if missing).
+        csv_sep (str): the CSV separator.
+        quoting (int): the quoting of the CSV module. Defaults to csv.QUOTE_MINIMAL.
+        compression (str): None (or 'none'), 'gzip' or 'zstd'.
+        workers (int): the number of processes (or threads) formatting the blocks (1 to format them in the calling thread).
+        chunk_rows (int): the number of rows of every block.
+        executor (str): 'process' or 'thread' (the formatting of 'to_csv' holds the GIL: threads do not run it in parallel).
+
+    Returns:
+        Path: the path of the file written.
+    """
+    if compression in [None, "none", ""]:
+        compression = None
+    elif compression not in CSV_COMPRESSION_SUFFIX:
+        raise ValueError(f"Compression '{compression}' not supported (none, {', '.join(CSV_COMPRESSION_SUFFIX)})")
+    path_out = Path(path_out)
+    if compression is not None and path_out.suffix != CSV_COMPRESSION_SUFFIX[compression]:
+        path_out = path_out.with_name(f"{path_out.name}{CSV_COMPRESSION_SUFFIX[compression]}")
+    workers = max(1, int(workers))
+    chunk_rows = max(1, int(chunk_rows))
+
+    df = df_format_datetime_columns(df, csv_sep)
+    # Blocks of rows: (start, end); an empty dataframe is written as its header only
+    list_blocks = [(start, min(start + chunk_rows, len(df))) for start in range(0, len(df), chunk_rows)] or [(0, 0)]
+
+    path_tmp = path_out.with_name(f".{path_out.name}.{os.getpid()}.tmp")
+    try:
+        with open(path_tmp, "wb") as file_raw, csv_open_output(file_raw, path_out, compression) as file_out:
+            if workers == 1 or len(list_blocks) == 1:
+                for block_pos, (start, end) in enumerate(list_blocks):
+                    file_out.write(csv_format_block(df.iloc[start:end], block_pos == 0, csv_sep, quoting))
+            else:
+                pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+                with pool_class(max_workers=workers) as pool:
+                    # At most two blocks per worker are pending, the blocks are written in order as soon as they are ready
+                    queue_futures = deque()
+                    for block_pos, (start, end) in enumerate(list_blocks):
+                        queue_futures.append(pool.submit(csv_format_block, df.iloc[start:end], block_pos == 0, csv_sep, quoting))
+                        if len(queue_futures) >= workers * 2:
+                            file_out.write(queue_futures.popleft().result())
+                    while queue_futures:
+                        file_out.write(queue_futures.popleft().result())
+        os.replace(path_tmp, path_out)
+        csv_remove_siblings(path_out)
+    finally:
+        if path_tmp.exists():
+            path_tmp.unlink()
+    return path_out
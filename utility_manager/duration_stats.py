@@ -0,0 +1,304 @@
+import math
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+TDIGEST_COMPRESSION = 500   # t-digest compression (at most about compression / 2 centroids are kept)
+TDIGEST_BUFFER = 1000       # values buffered before merging them in the centroids
+DIMENSION_SEP = "+"         # separator of the columns of a combined dimension (e.g., 'sezione_regionale+oggetto_principale_contratto')
+THRESHOLD_DIMENSION = "threshold_position" # derived dimension: 'above' / 'below' the threshold of the contract type
+CONTRACT_TYPE_CODES = {"LAVORI": "W", "SERVIZI": "S", "FORNITURE": "U"} # code of the contract type in the event logs (oggetto_principale_contratto)
+
+### THRESHOLDS ###
+
+def thresholds_by_code(dic_thresholds: dict) -> dict:
+    """
+    Maps the threshold amounts by contract type (THRESHOLDS in config.yml) to the codes of oggetto_principale_contratto.
+
+    Parameters:
+        dic_thresholds (dict): the threshold amount by contract type (LAVORI, SERVIZI, FORNITURE).
+
+    Returns:
+        dict: the threshold amount by code (W, S, U).
+    """
+    return {CONTRACT_TYPE_CODES[key]: value for key, value in dic_thresholds.items()}
+
+def thresholds_bounds(dic_thresholds: dict) -> list:
+    """
+    Returns the distinct threshold amounts, sorted (the bounds of the amount buckets of the bitmap indexes).
+
+    Parameters:
+        dic_thresholds (dict): the threshold amount by contract type.
+
+    Returns:
+        list: the sorted distinct amounts.
+    """
+    return sorted(set(float(value) for value in dic_thresholds.values()))
+
+### MOMENTS (Welford) ###
+
+def moments_new() -> dict:
+    """
+    Creates empty running moments (count, mean and sum of squared deviations, as in Welford's algorithm).
+
+    Returns:
+        dict: the moments.
+    """
+    return {"count": 0, "mean": 0.0, "m2": 0.0}
+
+def moments_merge(moments_a: dict, moments_b: dict) -> dict:
+    """
+    Merges two running moments (Chan's parallel update of Welford's algorithm).
+
+    Parameters:
+        moments_a (dict): the first moments.
+        moments_b (dict): the second moments.
+
+    Returns:
+        dict: the moments of the union of the values.
+    """
+    count = moments_a["count"] + moments_b["count"]
+    if count == 0:
+        return moments_new()
+    delta = moments_b["mean"] - moments_a["mean"]
+    mean = moments_a["mean"] + delta * moments_b["count"] / count
+    m2 = moments_a["m2"] + moments_b["m2"] + delta ** 2 * moments_a["count"] * moments_b["count"] / count
+    return {"count": count, "mean": mean, "m2": m2}
+
+def moments_add(moments: dict, values: np.ndarray) -> dict:
+    """
+    Adds a batch of values to running moments.
+
+    Parameters:
+        moments (dict): the moments.
+        values (np.ndarray): the values.
+
+    Returns:
+        dict: the updated moments.
+    """
+    if len(values) == 0:
+        return moments
+    mean = float(np.mean(values))
+    moments_batch = {"count": len(values), "mean": mean, "m2": float(np.sum((values - mean) ** 2))}
+    return moments_merge(moments, moments_batch)
+
+### QUANTILES (t-digest) ###
+
+def tdigest_new() -> dict:
+    """
+    Creates an empty t-digest (merging variant), a sketch of the distribution of the values giving approximate quantiles (most precise in the tails).
+
+    Returns:
+        dict: the t-digest.
+    """
+    return {"means": np.empty(0), "weights": np.empty(0), "buffer": [], "min": math.inf, "max": -math.inf}
+
+def tdigest_scale(q: float) -> float:
+    """
+    Scale function k1 of the t-digest: a centroid can span at most one unit of k.
+
+    Parameters:
+        q (float): the quantile.
+
+    Returns:
+        float: the scale value.
+    """
+    return TDIGEST_COMPRESSION / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+def tdigest_compress(digest: dict) -> dict:
+    """
+    Merges the buffered values (and the centroids) in the fewest centroids allowed by the scale function.
+
+    Parameters:
+        digest (dict): the t-digest.
+
+    Returns:
+        dict: the compressed t-digest.
+    """
+    if len(digest["buffer"]) == 0 and len(digest["means"]) <= TDIGEST_COMPRESSION * 2:
+        return digest
+    means = np.concatenate([digest["means"], np.asarray(digest["buffer"], dtype=float)])
+    weights = np.concatenate([digest["weights"], np.ones(len(digest["buffer"]))])
+    digest = {"means": means, "weights": weights, "buffer": [], "min": digest["min"], "max": digest["max"]}
+    if len(means) == 0:
+        return digest
+    order = np.argsort(means, kind="mergesort")
+    means, weights = means[order], weights[order]
+    weight_total = weights.sum()
+    list_means, list_weights = [], []
+    mean_cur, weight_cur = means[0], weights[0]
+    weight_before = 0.0
+    scale_left = tdigest_scale(0.0)
+    for mean, weight in zip(means[1:], weights[1:]):
+        if tdigest_scale((weight_before + weight_cur + weight) / weight_total) - scale_left <= 1:
+            weight_cur += weight
+            mean_cur += (mean - mean_cur) * weight / weight_cur
+        else:
+            list_means.append(mean_cur)
+            list_weights.append(weight_cur)
+            weight_before += weight_cur
+            scale_left = tdigest_scale(weight_before / weight_total)
+            mean_cur, weight_cur = mean, weight
+    list_means.append(mean_cur)
+    list_weights.append(weight_cur)
+    digest["means"], digest["weights"] = np.array(list_means), np.array(list_weights)
+    return digest
+
+def tdigest_add(digest: dict, values: np.ndarray) -> dict:
+    """
+    Adds a batch of values to a t-digest.
+
+    Parameters:
+        digest (dict): the t-digest.
+        values (np.ndarray): the values.
+
+    Returns:
+        dict: the updated t-digest.
+    """
+    if len(values) == 0:
+        return digest
+    digest["buffer"].extend(np.asarray(values, dtype=float).tolist())
+    digest["min"] = min(digest["min"], float(np.min(values)))
+    digest["max"] = max(digest["max"], float(np.max(values)))
+    if len(digest["buffer"]) >= TDIGEST_BUFFER:
+        digest = tdigest_compress(digest)
+    return digest
+
+def tdigest_merge(digest_a: dict, digest_b: dict) -> dict:
+    """
+    Merges two t-digests.
+
+    Parameters:
+        digest_a (dict): the first t-digest.
+        digest_b (dict): the second t-digest.
+
+    Returns:
+        dict: the t-digest of the union of the values.
+    """
+    digest = {"means": np.concatenate([digest_a["means"], digest_b["means"]]), "weights": np.concatenate([digest_a["weights"], digest_b["weights"]]), "buffer": digest_a["buffer"] + digest_b["buffer"], "min": min(digest_a["min"], digest_b["min"]), "max": max(digest_a["max"], digest_b["max"])}
+    # The centroids are merged again only if there are buffered values or too many centroids
+    return tdigest_compress(digest)
+
+def tdigest_quantile(digest: dict, q: float) -> float:
+    """
+    Returns the approximate quantile of the values of a t-digest (interpolating between the centroids, exact for the minimum and the maximum).
+
+    Parameters:
+        digest (dict): the t-digest.
+        q (float): the quantile (between 0 and 1).
+
+    Returns:
+        float: the value of the quantile (NaN if the t-digest is empty).
+    """
+    digest = tdigest_compress(digest) if len(digest["buffer"]) > 0 else digest
+    if len(digest["means"]) == 0:
+        return math.nan
+    weights = digest["weights"]
+    weight_total = weights.sum()
+    # Centroids are placed at the middle of their weight, the minimum and the maximum at the ends
+    centers = np.cumsum(weights) - weights / 2
+    positions = np.concatenate([[0.0], centers, [weight_total]])
+    values = np.concatenate([[digest["min"]], digest["means"], [digest["max"]]])
+    return float(np.interp(q * weight_total, positions, values))
+
+### CASE DURATION ###
+
+def case_duration_table(df_log: pd.DataFrame, list_dims: list, dic_thresholds: dict = {}) -> pd.DataFrame:
+    """
+    Creates the table of the cases of the event log with their duration in months and the columns of the dimensions (first value of the case).
+    The duration in months is computed as in calculate_case_statistics (03_log_filter_threshold.py).
+
+    Parameters:
+        df_log (pd.DataFrame): the event log (with all the events of its cases).
+        list_dims (list): the dimensions (columns, combined with '+', and THRESHOLD_DIMENSION).
+        dic_thresholds (dict): the threshold amount for every contract type (oggetto_principale_contratto), for THRESHOLD_DIMENSION.
+
+    Returns:
+        pd.DataFrame: the cases with 'duration_months' and the columns of the dimensions.
+    """
+    list_cols = []
+    for dim in list_dims:
+        list_dim_cols = ["oggetto_principale_contratto", "importo_lotto"] if dim == THRESHOLD_DIMENSION else dim.split(DIMENSION_SEP)
+        list_cols.extend(col for col in list_dim_cols if col not in list_cols)
+    dic_agg = {"start_time": ("event_timestamp", "min"), "end_time": ("event_timestamp", "max")}
+    dic_agg.update({col: (col, "first") for col in list_cols})
+    df_events = df_log[["case_id", "event_timestamp"] + list_cols].copy()
+    df_events["event_timestamp"] = pd.to_datetime(df_events["event_timestamp"])
+    df_cases = df_events.groupby("case_id").agg(**dic_agg).reset_index()
+
+    def calculate_duration_in_months(start_time, end_time):
+        delta = relativedelta(end_time, start_time)
+        return delta.years * 12 + delta.months + delta.days / 30 # Approximation for days
+
+    df_cases["duration_months"] = [calculate_duration_in_months(start_time, end_time) for start_time, end_time in zip(df_cases["start_time"], df_cases["end_time"])]
+    if THRESHOLD_DIMENSION in list_dims:
+        amount_threshold = df_cases["oggetto_principale_contratto"].map(dic_thresholds).astype(float)
+        df_cases[THRESHOLD_DIMENSION] = np.where(df_cases["importo_lotto"] > amount_threshold, "above", "below")
+        df_cases.loc[amount_threshold.isna() | df_cases["importo_lotto"].isna(), THRESHOLD_DIMENSION] = None
+    return df_cases
+
+### STATS ENGINE ###
+
+def duration_stats_update(dic_stats: dict, df_cases: pd.DataFrame, list_dims: list) -> dict:
+    """
+    Adds the durations of a table of cases to the stats of every dimension (cases with a missing dimension value are skipped for that dimension).
+    Every case must be in one table only: the stats of tables of different cases (chunks, workers) are combined with duration_stats_merge.
+
+    Parameters:
+        dic_stats (dict): the stats by (dimension, value), as returned by this function (empty dict to start).
+        df_cases (pd.DataFrame): the cases (see case_duration_table).
+        list_dims (list): the dimensions.
+
+    Returns:
+        dict: the updated stats, with the moments and the t-digest of every (dimension, value).
+    """
+    for dim in list_dims:
+        list_dim_cols = [THRESHOLD_DIMENSION] if dim == THRESHOLD_DIMENSION else dim.split(DIMENSION_SEP)
+        for dim_value, df_group in df_cases.groupby(list_dim_cols, dropna=True, sort=False)["duration_months"]:
+            dim_value = DIMENSION_SEP.join(str(value) for value in dim_value)
+            values = df_group.to_numpy(dtype=float)
+            stats = dic_stats.setdefault((dim, dim_value), {"moments": moments_new(), "digest": tdigest_new()})
+            stats["moments"] = moments_add(stats["moments"], values)
+            stats["digest"] = tdigest_add(stats["digest"], values)
+    return dic_stats
+
+def duration_stats_merge(dic_stats_a: dict, dic_stats_b: dict) -> dict:
+    """
+    Merges the stats of two disjoint sets of cases (e.g., chunks of the event log or results of parallel workers).
+
+    Parameters:
+        dic_stats_a (dict): the first stats (see duration_stats_update).
+        dic_stats_b (dict): the second stats.
+
+    Returns:
+        dict: the stats of the union of the cases.
+    """
+    dic_stats = dict(dic_stats_a)
+    for key, stats_b in dic_stats_b.items():
+        if key in dic_stats:
+            stats_a = dic_stats[key]
+            dic_stats[key] = {"moments": moments_merge(stats_a["moments"], stats_b["moments"]), "digest": tdigest_merge(stats_a["digest"], stats_b["digest"])}
+        else:
+            dic_stats[key] = stats_b
+    return dic_stats
+
+def duration_stats_to_df(dic_stats: dict, list_quantiles: list) -> pd.DataFrame:
+    """
+    Converts the stats to a dataframe: number of cases, mean, standard deviation (sample) and approximate quantiles of the duration for every (dimension, value).
+
+    Parameters:
+        dic_stats (dict): the stats (see duration_stats_update).
+        list_quantiles (list): the quantiles (e.g., [0.5, 0.9, 0.99] for the columns 'p50_duration', 'p90_duration', 'p99_duration').
+
+    Returns:
+        pd.DataFrame: the stats ordered by dimension and value (rounded to 2 decimals).
+    """
+    list_rows = []
+    for (dim, dim_value), stats in sorted(dic_stats.items()):
+        moments = stats["moments"]
+        row = {"dimension": dim, "value": dim_value, "case_len": moments["count"], "mean_duration": moments["mean"], "std_dev_duration": math.sqrt(moments["m2"] / (moments["count"] - 1)) if moments["count"] > 1 else math.nan}
+        for q in list_quantiles:
+            row[f"p{round(q * 100, 1):g}_duration"] = tdigest_quantile(stats["digest"], q)
+        list_rows.append(row)
+    df_stats = pd.DataFrame(list_rows, columns=["dimension", "value", "case_len", "mean_duration", "std_dev_duration"] + [f"p{round(q * 100, 1):g}_duration" for q in list_quantiles])
+    return df_stats.round(2)
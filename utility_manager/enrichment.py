@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from utility_manager.utilities import od_file_open
+
+LOOKUP_AGGS = ["join", "count", "first"] # reductions of the rows of a key of a lookup dataset
+LOOKUP_AGG_DEFAULT = "join"              # all the distinct values of the key
+LOOKUP_JOIN_SEP = "|"                    # separator of the values joined
+
+def enrich_key_columns(list_col_enrich_dic: list) -> list:
+    """
+    Returns the columns of the main tender file used as keys of the lookup datasets (besides the CIG).
+
+    Parameters:
+        list_col_enrich_dic (list): the lookup datasets (see conf_cols_enrich.json), as returned by json_to_list_dict.
+
+    Returns:
+        list: the key columns of the main tender file.
+    """
+    list_cols = []
+    for enrich_dic in list_col_enrich_dic:
+        for conf_enrich in enrich_dic.values():
+            col_tender = conf_enrich["key"][0]
+            if col_tender != "cig" and col_tender not in list_cols:
+                list_cols.append(col_tender)
+    return list_cols
+
+def lookup_read(dir_name: str, file_name: str, key_col: str, list_features: list, list_keys: list, chunk_rows: int = None, csv_sep: str = ";", dic_where: dict = None, agg = LOOKUP_AGG_DEFAULT) -> pd.DataFrame:
+    """
+    Reads a lookup dataset once, with only its key and the needed columns, keeping only the rows of the keys needed (semi-join) and matching the filters.
+    The rows of a key are reduced to one value per feature: 'join' (the distinct values, sorted and joined with LOOKUP_JOIN_SEP), 'count' (the number of distinct values) or 'first' (the value of the first row of the key, to be used only when the filters leave one row per key).
+    The values are read as text (as in the dataset, e.g. codes with leading zeros); missing values are ignored by 'join' and 'count'.
+
+    Parameters:
+        dir_name (str): the directory of the dataset.
+        file_name (str): the dataset (CSV file, also compressed).
+        key_col (str): the key column of the dataset.
+        list_features (list): the columns to be attached.
+        list_keys (list): the keys needed.
+        chunk_rows (int): if given, the file is parsed in chunks of rows (to limit the memory used).
+        csv_sep (str): the CSV separator.
+        dic_where (dict): the values to be kept for each column (values in OR, columns in AND; None matches a missing value).
+        agg: the reduction of the rows of a key ('join', 'count' or 'first'), for all the features or by feature (dict).
+
+    Returns:
+        pd.DataFrame: the lookup indexed by its key (a hash index, one row per key).
+    """
+    dic_where = dic_where or {}
+    dic_agg = {col: agg.get(col, LOOKUP_AGG_DEFAULT) if isinstance(agg, dict) else agg for col in list_features}
+    for col, col_agg in dic_agg.items():
+        if col_agg not in LOOKUP_AGGS:
+            raise ValueError(f"Aggregation '{col_agg}' of '{col}' not supported ({', '.join(LOOKUP_AGGS)})")
+    list_cols = [key_col] + [col for col in list_features if col != key_col]
+    list_cols_read = list_cols + [col for col in dic_where if col not in list_cols]
+    set_keys = set(list_keys)
+    list_df_chunk = []
+    with od_file_open(dir_name, file_name) as path_data:
+        reader = pd.read_csv(path_data, sep=csv_sep, usecols=list_cols_read, dtype=object, chunksize=chunk_rows, low_memory=False)
+        for df_chunk in (reader if chunk_rows is not None else [reader]):
+            mask = df_chunk[key_col].isin(set_keys)
+            for col, list_values in dic_where.items():
+                list_values = list_values if isinstance(list_values, list) else [list_values]
+                mask_col = df_chunk[col].isin([value for value in list_values if value is not None])
+                if None in list_values:
+                    mask_col |= df_chunk[col].isna()
+                mask &= mask_col
+            # Identical rows do not change the values of the key (the first row is kept)
+            list_df_chunk.append(df_chunk.loc[mask, list_cols].drop_duplicates())
+    df_rows = pd.concat(list_df_chunk).drop_duplicates()
+    index_keys = pd.Index(df_rows[key_col].drop_duplicates(), name=key_col)
+    df_lookup = pd.DataFrame(index=index_keys)
+    df_first = df_rows.drop_duplicates(subset=[key_col], keep="first").set_index(key_col)
+    for col in list_features:
+        if dic_agg[col] == "first":
+            df_lookup[col] = df_first[col]
+            continue
+        df_values = df_rows[[key_col, col]].dropna().drop_duplicates()
+        if dic_agg[col] == "count":
+            df_lookup[col] = df_values.groupby(key_col)[col].count().reindex(index_keys, fill_value=0)
+        else:
+            df_values = df_values.sort_values([key_col, col])
+            df_lookup[col] = df_values.groupby(key_col)[col].agg(LOOKUP_JOIN_SEP.join).reindex(index_keys).astype(object)
+    return df_lookup[list_features]
+
+def enrich_case_table(df_case_keys: pd.DataFrame, df_lookup: pd.DataFrame, key_col: str, list_features: list, prefix: str) -> pd.DataFrame:
+    """
+    Attaches the attributes of a lookup dataset to the case table, through the hash index of the lookup.
+
+    Parameters:
+        df_case_keys (pd.DataFrame): the case table (one row per CIG, with the key columns).
+        df_lookup (pd.DataFrame): the lookup indexed by its key (see lookup_read).
+        key_col (str): the key column of the case table.
+        list_features (list): the columns of the lookup to be attached.
+        prefix (str): the prefix of the attached columns.
+
+    Returns:
+        pd.DataFrame: the case table with the attached columns (missing if the key is not in the lookup).
+    """
+    # Position of the key of every case in the lookup (-1 if missing)
+    positions = df_lookup.index.get_indexer(df_case_keys[key_col])
+    found = positions >= 0
+    for col in list_features:
+        col_values = np.full(len(positions), None, dtype=object)
+        col_values[found] = df_lookup[col].to_numpy()[positions[found]]
+        df_case_keys[f"{prefix}{col}"] = col_values
+    return df_case_keys
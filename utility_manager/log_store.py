@@ -0,0 +1,184 @@
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utility_manager.utilities import df_read_csv, od_file_source
+from utility_manager.bitmap_index import bitmap_index_path, bitmap_index_build, bitmap_index_load, bitmap_index_query, bitmap_index_slice
+from utility_manager.duration_stats import THRESHOLD_DIMENSION, case_duration_table
+
+LOG_COL_TYPE = defaultdict(lambda: object, {"case_id":object,"event_name":object,"event_timestamp":object,"oggetto_principale_contratto":object, "importo_lotto":float, "accordo_quadro":object,"cpv_division":object,"sezione_regionale":object,"cod_tipo_scelta_contraente":object,"cod_modalita_realizzazione":object,"case_len":int}) # other columns (e.g., case attributes from the lookup datasets) as text
+LOG_COLS_EVENT = ["case_id", "event_name", "event_timestamp", "case_len"] # columns that are not trace attributes
+CATEGORY_RATIO_MAX = 0.5 # object columns with fewer distinct values than this share of the rows are kept as categories
+
+def log_store_load(dir_name: str, file_name: str, list_index_cols: list, amount_col: str, list_amount_bounds: list, dic_thresholds: dict, csv_sep: str = ";") -> dict:
+    """
+    Loads an event log in a compact in-memory form, with the indexes needed to answer queries without scanning it.
+    The object columns with few distinct values become categories, the bitmap index of the trace attributes is loaded (or built if missing or stale) and the table of the cases keeps their duration, trace attributes and row range.
+
+    Parameters:
+        dir_name (str): the directory of the event log.
+        file_name (str): the event log (CSV file, also compressed).
+        list_index_cols (list): the trace attributes indexed by bitmaps.
+        amount_col (str): the amount column indexed by buckets.
+        list_amount_bounds (list): the bounds of the amount buckets.
+        dic_thresholds (dict): the threshold amount by contract type (for 'threshold_position').
+        csv_sep (str): the CSV separator.
+
+    Returns:
+        dict: the store with the event log ('df'), its bitmap index ('index'), the cases ('cases', indexed by case_id) and the file loaded ('path', 'mtime_ns').
+    """
+    path_data = od_file_source(dir_name, file_name)[0]
+    mtime_ns = path_data.stat().st_mtime_ns
+    df_log = df_read_csv(dir_name, file_name, [], LOG_COL_TYPE, None, csv_sep)
+
+    # The saved index refers to the rows of the file (the labels of the dataframe), else it is built on the rows in memory
+    index_log = bitmap_index_load(bitmap_index_path(Path(dir_name) / file_name), path_data)
+    if index_log is None:
+        df_log = df_log.reset_index(drop=True)
+        index_log = bitmap_index_build(df_log, list_index_cols, amount_col, list_amount_bounds)
+
+    df_log["event_timestamp"] = pd.to_datetime(df_log["event_timestamp"])
+
+    # Cases: duration, trace attributes and row range (the log is ordered by case)
+    list_dims = [col for col in df_log.columns if col not in LOG_COLS_EVENT] + [THRESHOLD_DIMENSION]
+    df_cases = case_duration_table(df_log, list_dims, dic_thresholds)
+    case_values = df_log["case_id"].to_numpy()
+    case_starts = np.append(0, np.flatnonzero(case_values[1:] != case_values[:-1]) + 1) if len(df_log) > 0 else np.empty(0, dtype=int)
+    case_ends = np.append(case_starts[1:], len(df_log))
+    df_rows = pd.DataFrame({"row_start": case_starts, "row_end": case_ends}, index=pd.Index(case_values[case_starts], name="case_id"))
+    df_cases = df_cases.set_index("case_id").join(df_rows)
+    df_cases["case_len"] = df_cases["row_end"] - df_cases["row_start"]
+
+    # Compact form
+    for df in [df_log, df_cases]:
+        for col in df.columns:
+            if df[col].dtype == object and df[col].nunique() < CATEGORY_RATIO_MAX * max(len(df), 1):
+                df[col] = df[col].astype("category")
+
+    return {"df": df_log, "index": index_log, "cases": df_cases, "path": path_data, "mtime_ns": mtime_ns}
+
+def log_store_changed(store: dict) -> bool:
+    """
+    Checks whether the file of the event log has changed since it was loaded.
+
+    Parameters:
+        store (dict): the store (see log_store_load).
+
+    Returns:
+        bool: True if the file has changed (or has been removed).
+    """
+    path_data = Path(store["path"])
+    return not path_data.exists() or path_data.stat().st_mtime_ns != store["mtime_ns"]
+
+def log_store_mask(df: pd.DataFrame, dic_filters: dict, amount_col: str = None, amount_gt: float = None, amount_le: float = None) -> pd.Series:
+    """
+    Boolean mask of the rows matching the filters (values of a column in OR, columns in AND), for the filters that the bitmap index cannot answer.
+
+    Parameters:
+        df (pd.DataFrame): the dataframe.
+        dic_filters (dict): the values to be kept for each column.
+        amount_col (str): the amount column.
+        amount_gt (float): the amounts must be greater than this value (None for no lower limit).
+        amount_le (float): the amounts must be lower or equal to this value (None for no upper limit).
+
+    Returns:
+        pd.Series: the mask.
+    """
+    mask = pd.Series(True, index=df.index)
+    for col, list_values in dic_filters.items():
+        if col not in df.columns:
+            raise KeyError(f"The column '{col}' is not in the event log")
+        mask &= df[col].astype(str).isin([str(value) for value in list_values])
+    if amount_gt is not None:
+        mask &= df[amount_col] > float(amount_gt)
+    if amount_le is not None:
+        mask &= df[amount_col] <= float(amount_le)
+    return mask
+
+def log_store_slice(store: dict, dic_filters: dict, amount_gt: float = None, amount_le: float = None) -> pd.DataFrame:
+    """
+    Selects the events matching the filters, with the bitmap index for the indexed columns and amount bounds.
+
+    Parameters:
+        store (dict): the store (see log_store_load).
+        dic_filters (dict): the values to be kept for each column (values in OR, columns in AND).
+        amount_gt (float): the amounts must be greater than this value (None for no lower limit).
+        amount_le (float): the amounts must be lower or equal to this value (None for no upper limit).
+
+    Returns:
+        pd.DataFrame: the matching events, in the order of the log.
+    """
+    index_log = store["index"]
+    dic_indexed = {col: list_values for col, list_values in dic_filters.items() if col in index_log["bitmaps"]}
+    dic_others = {col: list_values for col, list_values in dic_filters.items() if col not in dic_indexed}
+    amount_indexed = all(amount is None or float(amount) in index_log["amount_bounds"] for amount in [amount_gt, amount_le])
+    df_slice = bitmap_index_slice(store["df"], bitmap_index_query(index_log, dic_indexed, amount_gt if amount_indexed else None, amount_le if amount_indexed else None))
+    if len(dic_others) > 0 or not amount_indexed:
+        df_slice = df_slice[log_store_mask(df_slice, dic_others, index_log["amount_col"], None if amount_indexed else amount_gt, None if amount_indexed else amount_le)]
+    return df_slice
+
+def log_store_events(store: dict, list_cig: list) -> pd.DataFrame:
+    """
+    Returns the events of the given cases (with the row ranges of the cases, no scan of the log).
+
+    Parameters:
+        store (dict): the store (see log_store_load).
+        list_cig (list): the case IDs (CIG).
+
+    Returns:
+        pd.DataFrame: the events of the cases found, in the order of the log.
+    """
+    df_cases = store["cases"]
+    df_found = df_cases.loc[df_cases.index.intersection(list_cig)].sort_values("row_start")
+    list_positions = [np.arange(row_start, row_end) for row_start, row_end in zip(df_found["row_start"], df_found["row_end"])]
+    positions = np.concatenate(list_positions) if len(list_positions) > 0 else np.empty(0, dtype=int)
+    return store["df"].iloc[positions]
+
+def log_store_cases(store: dict, dic_filters: dict, min_duration: float = None, max_duration: float = None) -> pd.DataFrame:
+    """
+    Returns the cases matching the filters on their trace attributes and duration (in months).
+
+    Parameters:
+        store (dict): the store (see log_store_load).
+        dic_filters (dict): the values to be kept for each trace attribute (also 'threshold_position').
+        min_duration (float): the minimum duration in months (None for no limit).
+        max_duration (float): the maximum duration in months (None for no limit).
+
+    Returns:
+        pd.DataFrame: the matching cases (without the row ranges).
+    """
+    df_cases = store["cases"]
+    mask = log_store_mask(df_cases, dic_filters)
+    if min_duration is not None:
+        mask &= df_cases["duration_months"] >= float(min_duration)
+    if max_duration is not None:
+        mask &= df_cases["duration_months"] <= float(max_duration)
+    return df_cases[mask].drop(columns=["row_start", "row_end"])
+
+def log_store_aggregate(store: dict, list_by: list, dic_filters: dict, min_duration: float = None, max_duration: float = None) -> pd.DataFrame:
+    """
+    Aggregates the cases matching the filters by the given trace attributes: number of cases and events, mean, median and 90th percentile of the duration (in months).
+
+    Parameters:
+        store (dict): the store (see log_store_load).
+        list_by (list): the trace attributes to group by (also 'threshold_position').
+        dic_filters (dict): the values to be kept for each trace attribute.
+        min_duration (float): the minimum duration in months (None for no limit).
+        max_duration (float): the maximum duration in months (None for no limit).
+
+    Returns:
+        pd.DataFrame: the aggregates, one row per group.
+    """
+    df_cases = log_store_cases(store, dic_filters, min_duration, max_duration)
+    for col in list_by:
+        if col not in df_cases.columns:
+            raise KeyError(f"The column '{col}' is not a trace attribute of the cases")
+    df_agg = df_cases.groupby(list_by, observed=True).agg(
+        cases=("duration_months", "size"),
+        events=("case_len", "sum"),
+        mean_duration=("duration_months", "mean"),
+        median_duration=("duration_months", "median"),
+        p90_duration=("duration_months", lambda durations: durations.quantile(0.9))
+    ).reset_index()
+    return df_agg.round({"mean_duration": 2, "median_duration": 2, "p90_duration": 2})
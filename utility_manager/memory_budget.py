@@ -0,0 +1,209 @@
+import contextlib
+import io
+import os
+import zipfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utility_manager.utilities import od_file_source, od_file_open
+
+MEMORY_AUTO_SHARE = 0.5   # share of the memory of the machine used with 'auto' budget
+MEMORY_SHARE_CHUNK = 0.1  # share of the budget for a chunk of rows being parsed (the parser needs a multiple of the final size)
+MEMORY_SHARE_DATA = 0.5   # share of the budget for the dataframes kept in memory (the rest is for the merge / sort copies)
+MEMORY_SHARE_PARTITION = 0.1 # share of the budget for the events of a partition of the cases (merged, ordered and finalised with a few copies)
+MEMORY_CHUNK_ROWS_MIN = 1000
+
+def memory_total_bytes() -> int:
+    """
+    Returns the memory available to the process: the physical memory of the machine or the limit of its container (cgroup), if lower.
+
+    Returns:
+        int: the memory in bytes (None if unknown).
+    """
+    memory_total = None
+    try:
+        memory_total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        pass
+    # Container limits (cgroup v2, then v1)
+    for path_limit in ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]:
+        try:
+            limit_text = Path(path_limit).read_text().strip()
+        except OSError:
+            continue
+        if limit_text.isdigit() and (memory_total is None or int(limit_text) < memory_total):
+            memory_total = int(limit_text)
+        break
+    return memory_total
+
+def memory_budget_bytes(budget_value) -> int:
+    """
+    Converts the memory budget of the configuration (MEMORY_BUDGET_MB) in bytes.
+
+    Parameters:
+        budget_value: the budget in MB, 'auto' (a share of the memory of the machine) or None / 0 (no budget).
+
+    Returns:
+        int: the budget in bytes (None if there is no budget).
+    """
+    if budget_value in [None, 0, "0", "none", ""]:
+        return None
+    if str(budget_value).lower() == "auto":
+        memory_total = memory_total_bytes()
+        return int(memory_total * MEMORY_AUTO_SHARE) if memory_total is not None else None
+    return int(float(budget_value) * 1024 * 1024)
+
+def df_memory_bytes(df: pd.DataFrame) -> int:
+    """
+    Returns the memory used by a dataframe (including the strings of the object columns).
+
+    Parameters:
+        df (pd.DataFrame): the dataframe.
+
+    Returns:
+        int: the memory in bytes.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def estimate_csv_memory(dir_name: str, file_name: str, list_col_type: dict, sample_rows: int, csv_sep: str = ";") -> tuple:
+    """
+    Estimates the memory needed to read a CSV file from a sample of its first rows.
+
+    Parameters:
+        dir_name (str): the directory of the CSV file.
+        file_name (str): the CSV file (also inside a '.zip', '.gz' or '.zst' file).
+        list_col_type (dict): columns type.
+        sample_rows (int): the rows of the sample.
+        csv_sep (str): the CSV separator.
+
+    Returns:
+        tuple: the memory per row (bytes) and the estimated number of rows of the file (None if unknown, e.g. for '.gz' and '.zst' files).
+    """
+    # The source is opened once: the lines of the sample are read as text, then parsed
+    with od_file_open(dir_name, file_name) as source:
+        with (open(source, 'rb') if isinstance(source, Path) else contextlib.nullcontext(source)) as fp:
+            list_lines = []
+            for _ in range(sample_rows + 1): # header and sample rows
+                line = fp.readline()
+                if len(line) == 0:
+                    break
+                list_lines.append(line)
+    sample_text = b"".join(list_lines)
+    df_sample = pd.read_csv(io.BytesIO(sample_text), sep=csv_sep, dtype=list_col_type, low_memory=False)
+    sample_len = max(len(df_sample), 1)
+    row_bytes = df_memory_bytes(df_sample) / sample_len
+
+    # The number of rows is estimated from the size of the (uncompressed) text and the size of the sample lines
+    path_data, member = od_file_source(dir_name, file_name)
+    text_bytes = None
+    if member is not None:
+        with zipfile.ZipFile(path_data) as zip_file:
+            text_bytes = zip_file.getinfo(member).file_size
+    elif path_data.name == file_name and path_data.exists():
+        text_bytes = path_data.stat().st_size
+    if text_bytes is None:
+        return row_bytes, None
+    sample_text_bytes = len(sample_text)
+    rows_num = int(text_bytes / max(sample_text_bytes / max(len(list_lines), 1), 1))
+    return row_bytes, rows_num
+
+def chunk_rows_for_budget(row_bytes: float, budget_bytes: int, budget_share: float = MEMORY_SHARE_CHUNK) -> int:
+    """
+    Returns the number of rows of a chunk fitting in a share of the memory budget.
+
+    Parameters:
+        row_bytes (float): the memory per row (bytes).
+        budget_bytes (int): the memory budget (bytes).
+        budget_share (float): the share of the budget for a chunk.
+
+    Returns:
+        int: the rows of a chunk (at least MEMORY_CHUNK_ROWS_MIN).
+    """
+    return max(int(budget_bytes * budget_share / max(row_bytes, 1)), MEMORY_CHUNK_ROWS_MIN)
+
+def csv_chunk_rows(dir_name: str, file_name: str, list_col_type: dict, budget_bytes: int, sample_rows: int, csv_sep: str = ";") -> int:
+    """
+    Chooses how to read a CSV file within the memory budget: in one go if it fits in the budget, else in chunks of rows (also if its size is unknown).
+
+    Parameters:
+        dir_name (str): the directory of the CSV file.
+        file_name (str): the CSV file (also inside a '.zip', '.gz' or '.zst' file).
+        list_col_type (dict): columns type.
+        budget_bytes (int): the memory budget (bytes, None if there is no budget).
+        sample_rows (int): the rows of the sample used for the estimate.
+        csv_sep (str): the CSV separator.
+
+    Returns:
+        int: the rows of a chunk (None to read the file in one go).
+    """
+    if budget_bytes is None:
+        return None
+    row_bytes, rows_num = estimate_csv_memory(dir_name, file_name, list_col_type, sample_rows, csv_sep)
+    memory_est = row_bytes * rows_num if rows_num is not None else None
+    print(f"Estimated memory: {round(memory_est / 1024**2, 1) if memory_est is not None else 'unknown'} MB (budget {round(budget_bytes / 1024**2, 1)} MB)")
+    if memory_est is not None and memory_est <= budget_bytes * MEMORY_SHARE_CHUNK:
+        return None
+    chunk_rows = chunk_rows_for_budget(row_bytes, budget_bytes)
+    print("Reading in chunks of rows:", chunk_rows)
+    return chunk_rows
+
+def df_case_chunks(df: pd.DataFrame, chunk_rows: int, case_col: str = "case_id") -> list:
+    """
+    Splits a dataframe ordered by case in chunks of about 'chunk_rows' rows, never splitting the events of a case.
+
+    Parameters:
+        df (pd.DataFrame): the dataframe ordered by case.
+        chunk_rows (int): the rows of a chunk (a chunk is longer if a case does not fit).
+        case_col (str): the case column.
+
+    Returns:
+        list: the chunks (dataframes) in the order of the dataframe.
+    """
+    list_chunks = []
+    # Positions where a new case starts (and the end of the dataframe)
+    case_values = df[case_col].to_numpy()
+    case_starts = np.append(np.flatnonzero(case_values[1:] != case_values[:-1]) + 1, len(df))
+    chunk_start = 0
+    while chunk_start < len(df):
+        # The chunk ends at the first case starting after 'chunk_rows' rows
+        chunk_end = int(case_starts[np.searchsorted(case_starts, chunk_start + chunk_rows)]) if chunk_start + chunk_rows < len(df) else len(df)
+        list_chunks.append(df.iloc[chunk_start:chunk_end])
+        chunk_start = chunk_end
+    if len(list_chunks) == 0:
+        list_chunks.append(df)
+    return list_chunks
+
+def case_partition_bounds(list_cases: list, partitions_num: int) -> np.ndarray:
+    """
+    Splits the case IDs in ranges with about the same number of cases: the ranges follow the order of the IDs, so processing the partitions in order gives an event log ordered by case.
+
+    Parameters:
+        list_cases (list): the case IDs.
+        partitions_num (int): the number of partitions.
+
+    Returns:
+        np.ndarray: the first case ID of every partition after the first (ordered).
+    """
+    case_values = np.sort(pd.Series(list_cases, dtype=object).dropna().unique())
+    if len(case_values) == 0:
+        return case_values
+    return np.unique(case_values[[len(case_values) * part_pos // partitions_num for part_pos in range(1, partitions_num)]])
+
+def df_case_partition(df: pd.DataFrame, bounds: np.ndarray, case_col: str = "case_id") -> np.ndarray:
+    """
+    Returns the partition of every row of a dataframe from the range of its case ID (see case_partition_bounds).
+
+    Parameters:
+        df (pd.DataFrame): the dataframe.
+        bounds (np.ndarray): the first case ID of every partition after the first.
+        case_col (str): the case column.
+
+    Returns:
+        np.ndarray: the partition of every row (the rows without case ID are in the last partition, as they are ordered last).
+    """
+    case_values = df[case_col].to_numpy(dtype=object)
+    mask_case = pd.notna(case_values)
+    partitions = np.full(len(df), len(bounds))
+    partitions[mask_case] = np.searchsorted(bounds, case_values[mask_case], side="right")
+    return partitions
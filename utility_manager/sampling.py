@@ -0,0 +1,43 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+def sample_hash_key(seed: str) -> str:
+    """
+    Derives the key of the hash function of the sample from its seed (the same seed always selects the same cases).
+
+    Parameters:
+        seed (str): the seed of the sample.
+
+    Returns:
+        str: the hash key (16 characters, as needed by pd.util.hash_array).
+    """
+    return hashlib.md5(str(seed).encode("utf-8")).hexdigest()[:16]
+
+def sample_cases(df: pd.DataFrame, fraction: float, list_strata_cols: list, seed: str, case_col: str = "cig") -> list:
+    """
+    Selects a deterministic stratified sample of the cases: in every stratum (combination of the values of the strata columns) the cases with the lowest hash of their ID are kept, 'fraction' of the cases of the stratum (at least one).
+    The sample does not depend on the order of the rows, and a case in the sample of a fraction is also in the samples of the larger fractions (with the same seed).
+
+    Parameters:
+        df (pd.DataFrame): the main tender file (a row per case, or more).
+        fraction (float): the fraction of the cases to be kept (0 < fraction <= 1).
+        list_strata_cols (list): the columns defining the strata (missing columns are skipped).
+        seed (str): the seed of the sample.
+        case_col (str): the case ID column.
+
+    Returns:
+        list: the IDs of the cases in the sample.
+    """
+    list_strata_cols = [col for col in list_strata_cols if col in df.columns]
+    df_cases = df[[case_col] + list_strata_cols].drop_duplicates(subset=[case_col], keep="first")
+    df_cases = df_cases.assign(case_hash=pd.util.hash_array(df_cases[case_col].astype(str).to_numpy(dtype=object), hash_key=sample_hash_key(seed)))
+    if len(list_strata_cols) == 0:
+        df_cases = df_cases.assign(stratum=0)
+        list_strata_cols = ["stratum"]
+    df_cases = df_cases.sort_values(list_strata_cols + ["case_hash"], kind="stable")
+    dic_groups = df_cases.groupby(list_strata_cols, dropna=False, sort=False)
+    case_rank = dic_groups.cumcount().to_numpy()
+    stratum_size = dic_groups[case_col].transform("size").to_numpy()
+    mask_sample = case_rank < np.maximum(np.ceil(stratum_size * fraction), 1)
+    return list(df_cases.loc[mask_sample, case_col])
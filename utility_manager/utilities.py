@@ -1,7 +1,14 @@
 import json
+import gzip
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
+import numpy as np
 import pandas as pd 
 
+OD_COMPRESSED_TYPES = (".zip", ".gz", ".zst") # compressed Open Data files read without extraction
+CSV_KEYS_CHUNK_ROWS = 100000 # rows of the chunks of a CSV file read keeping only some keys (see df_read_csv)
+
 def json_to_list_dict(json_file: str) -> list:
     """
     Extracts and sorts key-value pairs from a JSON file alphabetically by the keys.
@@ -64,6 +71,7 @@ def check_and_create_directory(dir_name:str, dir_parent:str="") -> None:
 def list_files_by_type(directory:str, extension:str) -> list:
     """
     List files in the given directory with a specific extension, excluding macOS temporary files.
+    Compressed files ('.zip', '.gz', '.zst') are also scanned: a 'name.csv.gz' / 'name.csv.zst' file is listed as 'name.csv' and every member of a '.zip' archive matching the extension is listed by its inner file name.
     
     Parameters:
         directory (str): The directory path to search in.
@@ -77,9 +85,85 @@ def list_files_by_type(directory:str, extension:str) -> list:
     file_list = []
     # List all files with the specified extension and filter out macOS temporary files
     file_list = [file.name for file in dir_path.glob(f'*{extension}') if not file.name.startswith('._')]
+    # List the files inside the compressed files (by inner file name, the plain file wins if both exist)
+    for file in sorted(dir_path.iterdir()) if dir_path.is_dir() else []:
+        if file.name.startswith('._') or file.suffix not in OD_COMPRESSED_TYPES:
+            continue
+        if file.suffix == ".zip":
+            with zipfile.ZipFile(file) as zip_file:
+                list_inner = [Path(member).name for member in zip_file.namelist() if not member.startswith('__MACOSX/')]
+        else:
+            list_inner = [file.stem]
+        for inner_name in list_inner:
+            if inner_name.endswith(extension) and not inner_name.startswith('._') and inner_name not in file_list:
+                file_list.append(inner_name)
     return file_list
 
 
+def od_file_source(dir_name: str, file_name: str) -> tuple:
+    """
+    Finds where a file of the Open Data catalogue is stored: as a plain file, as a '.gz' / '.zst' file or as a member of a '.zip' archive.
+
+    Parameters:
+        dir_name (str): the directory of the Open Data catalogue.
+        file_name (str): the (inner) file name to be found (e.g., 'TENDER_NOTICE.csv').
+
+    Returns:
+        tuple: the path of the file found and the name of the '.zip' member (None if the file is not a '.zip' archive).
+    """
+    dir_path = Path(dir_name)
+    path_data = dir_path / file_name
+    if path_data.exists():
+        return path_data, None
+    for suffix in [".gz", ".zst"]:
+        path_compressed = dir_path / f"{file_name}{suffix}"
+        if path_compressed.exists():
+            return path_compressed, None
+    # Archives named as the file come first (e.g., 'TENDER_NOTICE.zip'), then all the other archives
+    list_zip = sorted(dir_path.glob('*.zip'), key=lambda path_zip: path_zip.stem != Path(file_name).stem)
+    for path_zip in list_zip:
+        if path_zip.name.startswith('._'):
+            continue
+        with zipfile.ZipFile(path_zip) as zip_file:
+            for member in zip_file.namelist():
+                if not member.startswith('__MACOSX/') and Path(member).name == file_name:
+                    return path_zip, member
+    # Not found: the plain path is returned so that the reader raises the usual error
+    return path_data, None
+
+
+@contextmanager
+def od_file_open(dir_name: str, file_name: str):
+    """
+    Opens a file of the Open Data catalogue, decompressing it as a stream if it is stored in a '.zip', '.gz' or '.zst' file.
+
+    Parameters:
+        dir_name (str): the directory of the Open Data catalogue.
+        file_name (str): the (inner) file name to be opened (e.g., 'TENDER_NOTICE.csv').
+
+    Returns:
+        The path of the plain file or a binary stream of the decompressed file (to be passed to the CSV reader).
+    """
+    path_data, member = od_file_source(dir_name, file_name)
+    if member is not None:
+        with zipfile.ZipFile(path_data) as zip_file:
+            with zip_file.open(member) as stream:
+                yield stream
+    elif path_data.suffix == ".gz" and path_data.name != file_name:
+        with gzip.open(path_data, 'rb') as stream:
+            yield stream
+    elif path_data.suffix == ".zst" and path_data.name != file_name:
+        try:
+            import zstandard # optional dependency, only needed for '.zst' files
+        except ImportError as exc:
+            raise ImportError(f"The package 'zstandard' is needed to read '{path_data}' (pip install zstandard)") from exc
+        with open(path_data, 'rb') as fp:
+            with zstandard.ZstdDecompressor().stream_reader(fp) as stream:
+                yield stream
+    else:
+        yield path_data
+
+
 def get_values_from_dict_list(dict_list: list, key: str) -> list:
     """
     Given a list of dictionaries and a key, this function returns the list of values associated with the key.
@@ -102,26 +186,33 @@ def get_values_from_dict_list(dict_list: list, key: str) -> list:
     return []
 
 
-def df_read_csv(dir_name: str, file_name: str, list_col_exc: list, list_col_type:dict, nrows:int, csv_sep: str = ";") -> pd.DataFrame:
+def df_read_csv(dir_name: str, file_name: str, list_col_exc: list, list_col_type:dict, nrows:int, csv_sep: str = ";", chunk_rows: int = None, list_keys: list = None, key_col: str = "cig") -> pd.DataFrame:
     """
     Reads data from a CSV file into a pandas DataFrame excluding columns (if needed)
 
     Parameters:
         dir_name (str): the directory to the CSV file to be read.
-        file_name (str): the filename to the CSV file to be read.
+        file_name (str): the filename to the CSV file to be read (also found inside a '.zip', '.gz' or '.zst' file, see od_file_open).
         list_col_exc (list): columns to be excluded.
         list_col_type (dict): columns type.
         nrows (int): rows to be read (if None, all).
         sep (str, optional): the delimiter string used in the CSV file. Defaults to ';'.
+        chunk_rows (int, optional): if given, the file is parsed in chunks of rows and the duplicates are removed from every chunk before merging them (to limit the memory used). Defaults to None.
+        list_keys (list, optional): if given, only the rows whose 'key_col' is in the list are kept, chunk by chunk while reading (files without 'key_col' are read in full). Defaults to None.
+        key_col (str, optional): the key column of 'list_keys'. Defaults to 'cig'.
 
     Returns:
         pd.DataFrame: a pandas DataFrame containing the data read from the CSV file.
     """
-    path_data = Path(dir_name) / file_name
-    if nrows is not None:
-        df = pd.read_csv(path_data, sep=csv_sep, dtype=list_col_type, nrows=nrows, low_memory=False)
-    else:
-        df = pd.read_csv(path_data, sep=csv_sep, dtype=list_col_type, low_memory=False)
+    # The file can be plain or compressed ('.zip', '.gz', '.zst'): compressed files are decompressed as a stream
+    with od_file_open(dir_name, file_name) as path_data:
+        if nrows is not None:
+            df = pd.read_csv(path_data, sep=csv_sep, dtype=list_col_type, nrows=nrows, low_memory=False)
+        elif chunk_rows is not None or list_keys is not None:
+            # The rows of the other keys and the duplicates are removed from every chunk (see df_read_csv_chunks)
+            df = pd.concat(list(csv_source_chunks(path_data, list_col_exc, list_col_type, csv_sep, chunk_rows or CSV_KEYS_CHUNK_ROWS, list_keys, key_col)))
+        else:
+            df = pd.read_csv(path_data, sep=csv_sep, dtype=list_col_type, low_memory=False)
     if len(list_col_exc) > 0:
         for col_name in list_col_exc:
                 if col_name in df.columns:
@@ -130,6 +221,61 @@ def df_read_csv(dir_name: str, file_name: str, list_col_exc: list, list_col_type
     return df
 
 
+def df_read_csv_chunks(dir_name: str, file_name: str, list_col_exc: list, list_col_type: dict, csv_sep: str = ";", chunk_rows: int = CSV_KEYS_CHUNK_ROWS, list_keys: list = None, key_col: str = "cig"):
+    """
+    Reads a CSV file chunk by chunk (a generator): only one chunk of rows is parsed and kept at a time.
+    The chunks have the rows of df_read_csv: the rows of the other keys are removed and a row is removed if an equal row was in a previous chunk (compared by a 64-bit hash of its values, so only the hashes of the rows read are kept).
+    The dedup across the chunks is probabilistic: a row whose hash equals the one of a different previous row (about n^2 / 2^65 for n rows) is dropped as a duplicate.
+
+    Parameters:
+        dir_name (str): the directory to the CSV file to be read.
+        file_name (str): the filename to the CSV file to be read (also found inside a '.zip', '.gz' or '.zst' file, see od_file_open).
+        list_col_exc (list): columns to be excluded.
+        list_col_type (dict): columns type.
+        csv_sep (str, optional): the delimiter string used in the CSV file. Defaults to ';'.
+        chunk_rows (int, optional): the rows of every chunk. Defaults to CSV_KEYS_CHUNK_ROWS.
+        list_keys (list, optional): if given, only the rows whose 'key_col' is in the list are kept (files without 'key_col' are read in full). Defaults to None.
+        key_col (str, optional): the key column of 'list_keys'. Defaults to 'cig'.
+
+    Returns:
+        Generator of pd.DataFrame: the chunks, labelled by the row positions in the file.
+    """
+    with od_file_open(dir_name, file_name) as path_data:
+        yield from csv_source_chunks(path_data, list_col_exc, list_col_type, csv_sep, chunk_rows, list_keys, key_col)
+
+
+def csv_source_chunks(path_data, list_col_exc: list, list_col_type: dict, csv_sep: str = ";", chunk_rows: int = CSV_KEYS_CHUNK_ROWS, list_keys: list = None, key_col: str = "cig"):
+    """
+    Reads an opened CSV source chunk by chunk, as df_read_csv_chunks (the source is read once).
+
+    Parameters:
+        path_data: the path of the plain file or the binary stream of the decompressed file (see od_file_open).
+        list_col_exc (list): columns to be excluded.
+        list_col_type (dict): columns type.
+        csv_sep (str, optional): the delimiter string used in the CSV file. Defaults to ';'.
+        chunk_rows (int, optional): the rows of every chunk. Defaults to CSV_KEYS_CHUNK_ROWS.
+        list_keys (list, optional): if given, only the rows whose 'key_col' is in the list are kept. Defaults to None.
+        key_col (str, optional): the key column of 'list_keys'. Defaults to 'cig'.
+
+    Returns:
+        Generator of pd.DataFrame: the chunks, labelled by the row positions in the file.
+    """
+    set_keys = set(list_keys) if list_keys is not None else None
+    seen_hashes = np.empty(0, dtype=np.uint64) # sorted hashes of the rows of the previous chunks
+    for df_chunk in pd.read_csv(path_data, sep=csv_sep, dtype=list_col_type, chunksize=chunk_rows, low_memory=False):
+        if set_keys is not None and key_col in df_chunk.columns:
+            df_chunk = df_chunk[df_chunk[key_col].isin(set_keys)]
+        df_chunk = df_chunk.drop(columns=[col for col in list_col_exc if col in df_chunk.columns]).drop_duplicates()
+        # The numbers are hashed as floats: a column can be parsed as integers in a chunk and as floats in another (missing values)
+        df_hash = pd.DataFrame({col: df_chunk[col].astype(float) if pd.api.types.is_numeric_dtype(df_chunk[col]) and not pd.api.types.is_bool_dtype(df_chunk[col]) else df_chunk[col] for col in df_chunk.columns}, index=df_chunk.index, copy=False)
+        row_hashes = pd.util.hash_pandas_object(df_hash, index=False).to_numpy()
+        positions = np.minimum(np.searchsorted(seen_hashes, row_hashes), max(len(seen_hashes) - 1, 0))
+        mask_new = seen_hashes[positions] != row_hashes if len(seen_hashes) > 0 else np.ones(len(row_hashes), dtype=bool)
+        new_hashes = np.sort(row_hashes[mask_new])
+        seen_hashes = np.insert(seen_hashes, np.searchsorted(seen_hashes, new_hashes), new_hashes)
+        yield df_chunk[mask_new]
+
+
 def df_print_details(df: pd.DataFrame, title: str) -> None:
     """
     Prints details of a pandas DataFrame, including its size and a preview of its contents.